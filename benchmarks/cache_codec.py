@@ -0,0 +1,118 @@
+"""Compare cache codecs with the plain JSON files the caches used before.
+
+Run with ``python -m benchmarks.cache_codec`` from the repository root.
+"""
+
+import datetime
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from travel_bot.api import serialization, weather
+
+ROUNDS = 200
+
+
+def make_hotels() -> dict:
+    return {
+        "hotels": {
+            idx: {
+                "name": f"Grand Hotel Central Station {idx}",
+                "stars": 4,
+                "user_rating": 8.6,
+                "price": "£123",
+                "distance": 0.4 + idx,
+            }
+            for idx in range(5)
+        },
+        "info": {"error": None, "error_code": 0},
+    }
+
+
+def make_weather_store() -> dict:
+    today = datetime.date.today()
+    return {
+        datetime.date.strftime(today + datetime.timedelta(days=idx), "%Y-%m-%d"): {
+            "max_temp": 20.1 + idx / 10,
+            "min_temp": 11.4 - idx / 10,
+            "precip": idx * 5,
+            "fetched_at": time.time(),
+        }
+        for idx in range(weather.FORECAST_DAYS)
+    }
+
+
+def make_route_leg() -> dict:
+    points = np.cumsum(np.random.default_rng(0).normal(0, 1e-3, (2000, 2)), axis=0)
+    return {"points": points + (55.75, 37.61), "distance": 812345.6, "duration": 3.6e4}
+
+
+def measure(encode, decode, value) -> tuple[float, float, int]:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        data = encode(value)
+    encode_time = (time.perf_counter() - start) / ROUNDS
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        decode(data)
+    decode_time = (time.perf_counter() - start) / ROUNDS
+    return encode_time, decode_time, len(data)
+
+
+def measure_json_file(value, directory: str) -> tuple[float, float, int]:
+    # The previous caches: one pretty-large JSON document per file
+    path = os.path.join(directory, "value.json")
+
+    def encode(value):
+        with open(path, "w") as f:
+            json.dump(value, f)
+        return b"x" * os.path.getsize(path)
+
+    def decode(_):
+        with open(path, "r") as f:
+            return json.load(f)
+
+    return measure(encode, decode, value)
+
+
+def main():
+    # (value as the JSON files stored it, value as the cache stores it now)
+    weather_store, route_leg = make_weather_store(), make_route_leg()
+    payloads = {
+        "hotels": (make_hotels(), make_hotels()),
+        "weather": (weather_store, weather.pack_weather_store(weather_store)),
+        "route leg": (
+            {**route_leg, "points": route_leg["points"].tolist()},
+            {**route_leg, "points": route_leg["points"].astype(np.float32)},
+        ),
+    }
+    serializers = {"json": serialization.get_serializer("json", 0)}
+    if serialization.msgpack is not None:
+        serializers["msgpack"] = serialization.get_serializer("msgpack", 0)
+        if serialization.zstandard is not None:
+            serializers["msgpack+zstd"] = serialization.get_serializer("msgpack", 3)
+
+    print(
+        f"{'payload':<10} {'codec':<14} {'encode us':>10} {'decode us':>10} "
+        f"{'bytes':>8}"
+    )
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (plain_value, typed_value) in payloads.items():
+            results = {"json file": measure_json_file(plain_value, directory)}
+            for codec_name, serializer in serializers.items():
+                results[codec_name] = measure(
+                    serializer.encode, serializer.decode, typed_value
+                )
+            for codec_name, (encode_time, decode_time, size) in results.items():
+                print(
+                    f"{name:<10} {codec_name:<14} {encode_time * 1e6:>10.1f} "
+                    f"{decode_time * 1e6:>10.1f} {size:>8}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Render a route map from a seeded tile directory, without network access.
+
+Checks that every tile is served from the store and compares image formats.
+Run with ``python -m benchmarks.map_render`` from the repository root.
+"""
+
+import io
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from travel_bot.api import render, tiles
+
+ROUNDS = 10
+
+
+class RecordingTileStore(tiles.TileStore):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.requested = set()
+
+    def get(self, z: int, x: int, y: int) -> bytes | None:
+        self.requested.add((z, x, y))
+        return super().get(z, x, y)
+
+
+def make_route() -> list[list[tuple[float, float]]]:
+    # Moscow - Kazan, (lon, lat) as the renderer takes it
+    steps = np.linspace(0, 1, 500)
+    lons = 37.61 + (49.1 - 37.61) * steps
+    lats = 55.75 + 0.04 * steps + 0.3 * np.sin(steps * np.pi * 3)
+    return [list(zip(lons.tolist(), lats.tolist()))]
+
+
+def make_tile(z: int, x: int, y: int) -> bytes:
+    buffer = io.BytesIO()
+    color = (x * 37 % 256, y * 59 % 256, z * 16 % 256, 255)
+    Image.new("RGBA", (256, 256), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def main():
+    lines = make_route()
+    with tempfile.TemporaryDirectory() as directory:
+        # A first render with an empty offline store lists the tiles the map needs
+        store = RecordingTileStore(directory, 64 * 1024 * 1024, offline=True)
+        _, tile_stats = render.render_map(lines, store=store)
+        assert tile_stats["hits"] == 0 and tile_stats["misses"] > 0
+        for z, x, y in store.requested:
+            store.put(z, x, y, make_tile(z, x, y))
+
+        print(f"Seeded {len(store.requested)} tiles, {store.get_size()} bytes")
+        print(f"{'format':<8} {'render ms':>10} {'bytes':>8} {'hits':>6} {'misses':>7}")
+        for image_format in ("png", "jpeg", "webp"):
+            start = time.perf_counter()
+            for _ in range(ROUNDS):
+                img, tile_stats = render.render_map(
+                    lines, image_format=image_format, store=store
+                )
+            render_time = (time.perf_counter() - start) / ROUNDS
+
+            assert tile_stats["misses"] == 0, "map needs tiles missing from the store"
+            assert Image.open(io.BytesIO(img)).size == (
+                render.MAP_WIDTH,
+                render.MAP_HEIGHT,
+            )
+            print(
+                f"{image_format:<8} {render_time * 1e3:>10.1f} {len(img):>8} "
+                f"{tile_stats['hits']:>6} {tile_stats['misses']:>7}"
+            )
+
+        # Eviction keeps the store under its cap once renders report new tiles
+        store.max_size = store.get_size() // 2
+        store.record(0, 0, 1)
+        assert store.get_size() <= store.max_size
+        print(f"Evicted {store.evictions} tiles down to {store.get_size()} bytes")
+
+
+if __name__ == "__main__":
+    main()
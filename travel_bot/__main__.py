@@ -4,6 +4,7 @@ import os
 from telegram import Update, ReplyKeyboardMarkup
 from telegram.ext import Application, CommandHandler, ContextTypes
 
+from travel_bot.api import cache, http_client, render, tiles
 from travel_bot.bot.registration import register_conv_handler
 from travel_bot.bot.add_travels import new_travel_conv_handler
 from travel_bot.bot.edit_travel import edit_conv_handler, leave_travel_conv_handler
@@ -11,6 +12,7 @@ from travel_bot.bot.get_travel_info import (
     travel_info_conv_handler,
     user_travels_handler,
 )
+from travel_bot.bot.prefetch import prefetch_weather, WEATHER_PREFETCH_INTERVAL
 from travel_bot.bot.travel_purchases import purchases_conv_handler
 from travel_bot.bot.travel_notes import notes_conv_handler
 from travel_bot.keyboards.common import main_page_keyboard
@@ -28,7 +30,7 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_user = update.effective_user
-    if user.User.get_user(tg_user.id):
+    if await user.User.get_user(tg_user.id):
         reply_keyboard = main_page_keyboard
         await update.message.reply_html(
             rf"Hi {tg_user.mention_html()}! Type /new_travel to add new travel",
@@ -44,8 +46,31 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+class TravelBotApplication(Application):
+    async def process_update(self, update: object) -> None:
+        # Every model call closes its session, anything left open is a leak
+        update_id = getattr(update, "update_id", None)
+        with db_session.track_sessions(f"update {update_id}"):
+            await super().process_update(update)
+
+
+async def shutdown(application: Application) -> None:
+    await http_client.close_clients()
+    render.renderer.shutdown()
+    logger.info(f"Cache stats: {cache.cache.stats()}")
+    logger.info(f"Tile cache stats: {tiles.tile_store.stats()}")
+    cache.cache.close()
+    await db_session.close_engine()
+
+
 def main():
-    application = Application.builder().token(BOT_TOKEN).build()
+    application = (
+        Application.builder()
+        .application_class(TravelBotApplication)
+        .token(BOT_TOKEN)
+        .post_shutdown(shutdown)
+        .build()
+    )
     application.add_handlers(
         [
             CommandHandler("start", start),
@@ -59,6 +84,9 @@ def main():
             purchases_conv_handler,
         ]
     )
+    application.job_queue.run_repeating(
+        prefetch_weather, interval=WEATHER_PREFETCH_INTERVAL, first=10
+    )
     logger.info("Starting bot...")
     application.run_polling()
 
@@ -0,0 +1,222 @@
+import asyncio
+from collections import OrderedDict
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from travel_bot.api import serialization
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.getenv("CACHE_PATH", ".cache/cache.db")
+CACHE_MAX_SIZE = int(os.getenv("CACHE_MAX_SIZE", str(256 * 1024 * 1024)))
+CACHE_MEMORY_SIZE = int(os.getenv("CACHE_MEMORY_SIZE", str(32 * 1024 * 1024)))
+
+
+class Cache:
+    def __init__(
+        self,
+        path: str,
+        max_size: int,
+        memory_size: int,
+        serializer: "serialization.Serializer",
+    ):
+        self.path = path
+        self.max_size = max_size
+        self.memory_size = memory_size
+        self.serializer = serializer
+
+        # (namespace, key) -> (expires_at, encoded value), most recent last
+        self.memory = OrderedDict()
+        self.memory_used = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.__connection = None
+        self.__size = None
+        self.__lock = threading.RLock()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        if self.__connection is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self.__connection = sqlite3.connect(
+                self.path, check_same_thread=False, isolation_level=None
+            )
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, expires_at REAL, accessed_at REAL NOT NULL, "
+                "PRIMARY KEY (namespace, key))"
+            )
+            self.__connection.execute(
+                "CREATE INDEX IF NOT EXISTS ix_entries_accessed_at "
+                "ON entries (accessed_at)"
+            )
+        return self.__connection
+
+    @property
+    def size(self) -> int:
+        if self.__size is None:
+            (size,) = self.connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            self.__size = size
+        return self.__size
+
+    def remember(self, entry_key: tuple[str, str], expires_at, data: bytes) -> None:
+        if len(data) > self.memory_size:
+            return
+        self.forget(entry_key)
+        self.memory[entry_key] = (expires_at, data)
+        self.memory_used += len(data)
+        while self.memory_used > self.memory_size:
+            _, (_, old_data) = self.memory.popitem(last=False)
+            self.memory_used -= len(old_data)
+
+    def forget(self, entry_key: tuple[str, str]) -> None:
+        entry = self.memory.pop(entry_key, None)
+        if entry is not None:
+            self.memory_used -= len(entry[1])
+
+    def get(self, namespace: str, key: str, default=None):
+        entry_key = (namespace, key)
+        now = time.time()
+        with self.__lock:
+            if entry_key in self.memory:
+                expires_at, data = self.memory[entry_key]
+                if expires_at is None or expires_at > now:
+                    self.memory.move_to_end(entry_key)
+                    self.memory_hits += 1
+                    return self.serializer.decode(data)
+                self.forget(entry_key)
+
+            row = self.connection.execute(
+                "SELECT value, expires_at FROM entries WHERE namespace = ? AND key = ?",
+                entry_key,
+            ).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                if row is not None:
+                    self.delete(namespace, key)
+                self.misses += 1
+                return default
+
+            data, expires_at = row
+            try:
+                value = self.serializer.decode(data)
+            except RuntimeError as error:
+                # Written with a codec whose optional package is not installed
+                logger.warning(f"Dropping unreadable cache entry {entry_key}: {error}")
+                self.delete(namespace, key)
+                self.misses += 1
+                return default
+
+            self.connection.execute(
+                "UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, *entry_key),
+            )
+            self.remember(entry_key, expires_at, data)
+            self.disk_hits += 1
+            return value
+
+    def set(self, namespace: str, key: str, value, ttl: float | None = None) -> None:
+        entry_key = (namespace, key)
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        with self.__lock:
+            data = self.serializer.encode(value)
+            size = self.size
+            old_row = self.connection.execute(
+                "SELECT size FROM entries WHERE namespace = ? AND key = ?", entry_key
+            ).fetchone()
+            # Single statement, so readers never see a partially written entry
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries "
+                "(namespace, key, value, size, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*entry_key, data, len(data), expires_at, now),
+            )
+            self.__size = size + len(data) - (old_row[0] if old_row else 0)
+            self.remember(entry_key, expires_at, data)
+            self.writes += 1
+            if self.__size > self.max_size:
+                self.evict()
+
+    def delete(self, namespace: str, key: str) -> None:
+        entry_key = (namespace, key)
+        with self.__lock:
+            self.forget(entry_key)
+            self.connection.execute(
+                "DELETE FROM entries WHERE namespace = ? AND key = ?", entry_key
+            )
+            self.__size = None
+
+    # Async callers go through a thread, disk reads and writes block the loop
+    async def aget(self, namespace: str, key: str, default=None):
+        return await asyncio.to_thread(self.get, namespace, key, default)
+
+    async def aset(
+        self, namespace: str, key: str, value, ttl: float | None = None
+    ) -> None:
+        await asyncio.to_thread(self.set, namespace, key, value, ttl)
+
+    async def adelete(self, namespace: str, key: str) -> None:
+        await asyncio.to_thread(self.delete, namespace, key)
+
+    def evict(self) -> None:
+        # Expired entries go first, then least recently used down to 90% of the cap
+        with self.__lock:
+            self.connection.execute(
+                "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),),
+            )
+            self.__size = None
+            target_size = self.max_size * 0.9
+            rows = self.connection.execute(
+                "SELECT namespace, key, size FROM entries ORDER BY accessed_at"
+            )
+            to_delete = []
+            size = self.size
+            for namespace, key, entry_size in rows:
+                if size <= target_size:
+                    break
+                to_delete.append((namespace, key))
+                size -= entry_size
+
+            self.connection.executemany(
+                "DELETE FROM entries WHERE namespace = ? AND key = ?", to_delete
+            )
+            for entry_key in to_delete:
+                self.forget(entry_key)
+            self.evictions += len(to_delete)
+            self.__size = None
+            logger.info(f"Cache evicted {len(to_delete)} entries, size: {self.size}")
+
+    def stats(self) -> dict:
+        with self.__lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "size": self.size,
+                "memory_size": self.memory_used,
+                "memory_items": len(self.memory),
+            }
+
+    def close(self) -> None:
+        with self.__lock:
+            if self.__connection is not None:
+                self.__connection.close()
+                self.__connection = None
+
+
+cache = Cache(
+    CACHE_PATH, CACHE_MAX_SIZE, CACHE_MEMORY_SIZE, serialization.get_serializer()
+)
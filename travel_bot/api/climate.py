@@ -0,0 +1,190 @@
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+
+import numpy as np
+
+from travel_bot.api import http_client
+
+logger = logging.getLogger(__name__)
+
+CLIMATE_DATA_PATH = os.getenv("CLIMATE_DATA_PATH", "data/climate_normals.npy")
+CLIMATE_GRID_RESOLUTION = 0.5
+CLIMATE_REFERENCE_YEARS = (2014, 2023)
+CLIMATE_BATCH_SIZE = 20
+# Days with at least this much precipitation (mm) count as rainy
+RAINY_DAY_PRECIPITATION = 1.0
+
+# Array layout: (lat cell, lon cell, month, field), int16 to keep the file small.
+# Temperatures are stored in tenths of a degree, rainy day share in thousandths
+GRID_SHAPE = (int(180 / CLIMATE_GRID_RESOLUTION), int(360 / CLIMATE_GRID_RESOLUTION))
+MAX_TEMP, MIN_TEMP, RAINY_SHARE = range(3)
+FIELD_SCALES = (10, 10, 1000)
+MISSING = np.iinfo(np.int16).min
+
+__normals = None
+
+
+def get_cell(lat: float, lon: float) -> tuple[int, int]:
+    row = int((lat + 90) // CLIMATE_GRID_RESOLUTION)
+    col = int((lon + 180) // CLIMATE_GRID_RESOLUTION)
+    return min(max(row, 0), GRID_SHAPE[0] - 1), col % GRID_SHAPE[1]
+
+
+def get_cell_center(row: int, col: int) -> tuple[float, float]:
+    return (
+        (row + 0.5) * CLIMATE_GRID_RESOLUTION - 90,
+        (col + 0.5) * CLIMATE_GRID_RESOLUTION - 180,
+    )
+
+
+def load_normals() -> np.ndarray | None:
+    global __normals
+
+    if __normals is None and os.path.exists(CLIMATE_DATA_PATH):
+        # Memory-mapped, so only the pages of looked up cells are ever read
+        __normals = np.load(CLIMATE_DATA_PATH, mmap_mode="r")
+    return __normals
+
+
+def get_monthly_normals(lat: float, lon: float, month: int) -> dict | None:
+    normals = load_normals()
+    if normals is None:
+        return None
+
+    values = normals[(*get_cell(lat, lon), month - 1)]
+    if (values == MISSING).any():
+        return None
+    return {
+        "max_temp": float(values[MAX_TEMP]) / FIELD_SCALES[MAX_TEMP],
+        "min_temp": float(values[MIN_TEMP]) / FIELD_SCALES[MIN_TEMP],
+        "rainy_share": float(values[RAINY_SHARE]) / FIELD_SCALES[RAINY_SHARE],
+    }
+
+
+def get_expected_weather(
+    lat: float, lon: float, start_date: datetime.date, end_date: datetime.date
+) -> dict | None:
+    days = [
+        start_date + datetime.timedelta(days=idx)
+        for idx in range((end_date - start_date).days + 1)
+    ]
+    months = {day.month: get_monthly_normals(lat, lon, day.month) for day in days}
+    if any(normals is None for normals in months.values()):
+        return None
+
+    return {
+        "avg_day_temp": sum(months[day.month]["max_temp"] for day in days) / len(days),
+        "avg_night_temp": sum(months[day.month]["min_temp"] for day in days)
+        / len(days),
+        "expected_rainy_days": sum(months[day.month]["rainy_share"] for day in days),
+    }
+
+
+def get_cell_normals(daily: dict) -> np.ndarray:
+    months = np.array(
+        [datetime.date.fromisoformat(day).month for day in daily["time"]]
+    )
+    fields = (
+        np.array(daily["temperature_2m_max"], dtype=np.float64),
+        np.array(daily["temperature_2m_min"], dtype=np.float64),
+        np.array(
+            [
+                np.nan if precip is None else float(precip >= RAINY_DAY_PRECIPITATION)
+                for precip in daily["precipitation_sum"]
+            ]
+        ),
+    )
+
+    cell_normals = np.full((12, 3), MISSING, dtype=np.int16)
+    for month in range(1, 13):
+        for field, (values, scale) in enumerate(zip(fields, FIELD_SCALES)):
+            month_values = values[months == month]
+            month_values = month_values[~np.isnan(month_values)]
+            if len(month_values):
+                cell_normals[month - 1, field] = round(month_values.mean() * scale)
+    return cell_normals
+
+
+async def fetch_cell_normals(cells: list[tuple[int, int]]) -> list[np.ndarray | None]:
+    centers = [get_cell_center(row, col) for row, col in cells]
+    response = await http_client.get(
+        "https://archive-api.open-meteo.com/v1/archive",
+        params={
+            "latitude": ",".join(str(lat) for lat, _ in centers),
+            "longitude": ",".join(str(lon) for _, lon in centers),
+            "start_date": f"{CLIMATE_REFERENCE_YEARS[0]}-01-01",
+            "end_date": f"{CLIMATE_REFERENCE_YEARS[1]}-12-31",
+            "daily": [
+                "temperature_2m_max",
+                "temperature_2m_min",
+                "precipitation_sum",
+            ],
+        },
+        timeout=120,
+    )
+    if response is None or response.status_code != 200:
+        logger.warning(f"Climate API error for {len(cells)} cells")
+        return [None] * len(cells)
+
+    response = response.json()
+    histories = response if isinstance(response, list) else [response]
+    return [get_cell_normals(history["daily"]) for history in histories]
+
+
+async def build_normals(coords: list[tuple[float, float]]) -> None:
+    if os.path.exists(CLIMATE_DATA_PATH):
+        normals = np.load(CLIMATE_DATA_PATH)
+    else:
+        normals = np.full((*GRID_SHAPE, 12, 3), MISSING, dtype=np.int16)
+
+    cells = [
+        cell
+        for cell in dict.fromkeys(get_cell(lat, lon) for lat, lon in coords)
+        if (normals[cell] == MISSING).any()
+    ]
+    logger.info(f"Building climate normals for {len(cells)} cells")
+    for idx in range(0, len(cells), CLIMATE_BATCH_SIZE):
+        batch = cells[idx : idx + CLIMATE_BATCH_SIZE]
+        for cell, cell_normals in zip(batch, await fetch_cell_normals(batch)):
+            if cell_normals is not None:
+                normals[cell] = cell_normals
+    await http_client.close_clients()
+
+    os.makedirs(os.path.dirname(CLIMATE_DATA_PATH) or ".", exist_ok=True)
+    with open(f"{CLIMATE_DATA_PATH}.tmp", "wb") as f:
+        np.save(f, normals)
+    os.replace(f"{CLIMATE_DATA_PATH}.tmp", CLIMATE_DATA_PATH)
+
+
+async def build_city_normals(used_only: bool) -> None:
+    from travel_bot.db_manager import db_session
+    from travel_bot.db_models import city
+
+    coords = await city.City.get_coordinates(used_only=used_only)
+    await build_normals(coords)
+    await db_session.close_engine()
+
+
+def main():
+    from travel_bot.db_manager import db_session
+
+    parser = argparse.ArgumentParser(
+        description="Build monthly climate normals for the cells of known cities"
+    )
+    parser.add_argument(
+        "--all-cities",
+        action="store_true",
+        help="include every city, not only the ones used by users and travels",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db_session.global_init()
+    asyncio.run(build_city_normals(used_only=not args.all_cities))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import numpy as np
+
+# ~11 m, fine enough for any zoom level we render at
+CACHE_TOLERANCE = 1e-4
+
+
+def to_array(points) -> np.ndarray:
+    return np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+def flip(points) -> np.ndarray:
+    return to_array(points)[:, ::-1]
+
+
+def get_borders(points) -> tuple[tuple[float, float], tuple[float, float]]:
+    points = to_array(points)
+    min_x, min_y = points.min(axis=0)
+    max_x, max_y = points.max(axis=0)
+    return (float(min_x), float(max_x)), (float(min_y), float(max_y))
+
+
+def get_zoom_tolerance(
+    points, width: int, height: int, pixel_tolerance: float = 1.0
+) -> float:
+    # Points are (lon, lat) as drawn on the map. The map is zoomed so that the
+    # route's bounding box fits the image, so one pixel covers roughly
+    # span / image size degrees
+    (min_x, max_x), (min_y, max_y) = get_borders(points)
+    degrees_per_pixel = max((max_x - min_x) / width, (max_y - min_y) / height)
+    return degrees_per_pixel * pixel_tolerance
+
+
+def simplify(points, tolerance: float) -> np.ndarray:
+    points = to_array(points)
+    if len(points) < 3 or tolerance <= 0:
+        return points
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        first, last = points[start], points[end]
+        inner = points[start + 1 : end] - first
+        direction = last - first
+        length = np.hypot(*direction)
+        if length == 0:
+            distances = np.hypot(inner[:, 0], inner[:, 1])
+        else:
+            distances = (
+                np.abs(direction[0] * inner[:, 1] - direction[1] * inner[:, 0])
+                / length
+            )
+
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = start + 1 + farthest
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+
+    return points[keep]
@@ -1,40 +1,72 @@
-import os
-import json
-import requests
+import asyncio
 import logging
+import os
 
-from travel_bot.db_models import travel
+from travel_bot.api import cache, http_client, quota
+from travel_bot.api.single_flight import single_flight
+from travel_bot.db_models import city, hotel_region, travel
 
 logger = logging.getLogger(__name__)
 
+HOTELS_CACHE_TTL = int(os.getenv("HOTELS_CACHE_TTL", str(24 * 3600)))
+
+
+async def request_hotels_api(endpoint: str, **kwargs):
+    # Once the monthly budget is nearly spent only cached hotels are served
+    if quota.hotels_budget.is_degraded:
+        logger.warning(f"Hotels API budget exhausted, {endpoint} request skipped")
+        return None
+
+    # The token is taken before an HTTP slot, so waiting on the rate limit
+    # doesn't hold a slot other APIs could use
+    await quota.hotels_limiter.acquire()
+    quota.hotels_budget.record(endpoint)
+    async with http_client.semaphore:
+        return await http_client.get(
+            f"https://hotels-com-provider.p.rapidapi.com/v2/{endpoint}", **kwargs
+        )
+
 
-def get_location_id(location: str) -> str | None:
-    url = "https://hotels-com-provider.p.rapidapi.com/v2/regions"
+@single_flight
+async def get_location_id(location: str) -> str | None:
     querystring = {"query": location, "domain": "GB", "locale": "en_GB"}
     headers = {
         "X-RapidAPI-Key": "",
         "X-RapidAPI-Host": "hotels-com-provider.p.rapidapi.com",
     }
-    response = requests.get(url, headers=headers, params=querystring)
-    if response.status_code != 200:
+    response = await request_hotels_api(
+        "regions", headers=headers, params=querystring
+    )
+    if response is None or response.status_code != 200:
         logger.warning("Location API error")
         return None
     resp_json = response.json()
 
     try:
         return resp_json["data"][0]["gaiaId"]
-    except KeyError:
+    except (KeyError, IndexError):
         return None
 
 
-def get_hotels(location_id: str, start_date: str, end_date: str) -> dict:
-    if os.path.exists(f".cache/hotels/{location_id}_{start_date}_{end_date}.json"):
-        with open(
-            f".cache/hotels/{location_id}_{start_date}_{end_date}.json", "r"
-        ) as f:
-            return json.load(f)
+async def get_city_location_id(location: "city.City") -> str | None:
+    # Region ids practically never change, so they are looked up only once
+    location_id = await hotel_region.HotelRegion.get_region_id(location.id)
+    if location_id is not None:
+        return location_id
+
+    location_id = await get_location_id(location.name)
+    if location_id is not None:
+        await hotel_region.HotelRegion.save_region_id(location.id, location_id)
+    return location_id
+
+
+@single_flight
+async def get_hotels(location_id: str, start_date: str, end_date: str) -> dict:
+    cache_key = f"{location_id}_{start_date}_{end_date}"
+    cached_hotels = await cache.cache.aget("hotels", cache_key)
+    if cached_hotels is not None:
+        return cached_hotels
 
-    url = "https://hotels-com-provider.p.rapidapi.com/v2/hotels/search"
     querystring = {
         "region_id": location_id,
         "locale": "en_GB",
@@ -49,8 +81,10 @@ def get_hotels(location_id: str, start_date: str, end_date: str) -> dict:
         "X-RapidAPI-Key": "",
         "X-RapidAPI-Host": "hotels-com-provider.p.rapidapi.com",
     }
-    response = requests.get(url, headers=headers, params=querystring)
-    if response.status_code != 200:
+    response = await request_hotels_api(
+        "hotels/search", headers=headers, params=querystring
+    )
+    if response is None or response.status_code != 200:
         logger.warning("Hotels API error")
         return {"hotels": {}, "info": {"error": "API error", "error_code": 1}}
 
@@ -66,25 +100,28 @@ def get_hotels(location_id: str, start_date: str, end_date: str) -> dict:
             "distance": hotel["destinationInfo"]["distanceFromDestination"]["value"],
         }
 
-    with open(f".cache/hotels/{location_id}_{start_date}_{end_date}.json", "w") as f:
-        json.dump(hotels_response, f)
+    await cache.cache.aset("hotels", cache_key, hotels_response, ttl=HOTELS_CACHE_TTL)
     return hotels_response
 
 
-def get_hotels_for_travel(user_travel: "travel.Travel") -> dict:
-    if not os.path.exists(".cache/hotels"):
-        os.makedirs(".cache/hotels")
+async def get_hotels_for_travel(user_travel: "travel.Travel") -> dict:
+    location_ids = await asyncio.gather(
+        *(get_city_location_id(location) for location in user_travel.locations)
+    )
+    if not all(location_ids):
+        return {
+            "hotels": {},
+            "info": {"error": "Location API error", "error_code": 1},
+        }
 
-    response = {"hotels": {}, "info": {"error": None, "error_code": 0}}
-    for location in user_travel.locations:
-        location_id = get_location_id(location.name)
-        if not location_id:
-            return {
-                "hotels": {},
-                "info": {"error": "Location API error", "error_code": 1},
-            }
-        response["hotels"][location.name] = get_hotels(
-            location_id, user_travel.start_date, user_travel.end_date
+    locations_hotels = await asyncio.gather(
+        *(
+            get_hotels(location_id, user_travel.start_date, user_travel.end_date)
+            for location_id in location_ids
         )
+    )
+    response = {"hotels": {}, "info": {"error": None, "error_code": 0}}
+    for location, location_hotels in zip(user_travel.locations, locations_hotels):
+        response["hotels"][location.name] = location_hotels
 
     return response
@@ -0,0 +1,56 @@
+import asyncio
+import logging
+import os
+from typing import Awaitable
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "15"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "10"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "5"))
+HTTP_MAX_CONCURRENCY = int(os.getenv("HTTP_MAX_CONCURRENCY", "8"))
+
+__clients: dict[str, httpx.AsyncClient] = {}
+# Shared by every gather_limited call, so the bound holds across concurrent updates
+semaphore = asyncio.Semaphore(HTTP_MAX_CONCURRENCY)
+
+
+def get_client(url: str) -> httpx.AsyncClient:
+    host = urlsplit(url).netloc
+    client = __clients.get(host)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=httpx.Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+        __clients[host] = client
+    return client
+
+
+async def get(url: str, **kwargs) -> httpx.Response | None:
+    try:
+        return await get_client(url).get(url, **kwargs)
+    except httpx.HTTPError as e:
+        logger.warning(f"Request to {url} failed: {e!r}")
+        return None
+
+
+async def gather_limited(*aws: Awaitable) -> list:
+    async def run(aw: Awaitable):
+        async with semaphore:
+            return await aw
+
+    return await asyncio.gather(*(run(aw) for aw in aws))
+
+
+async def close_clients() -> None:
+    for client in __clients.values():
+        await client.aclose()
+    __clients.clear()
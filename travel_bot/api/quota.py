@@ -0,0 +1,83 @@
+import asyncio
+import datetime
+import json
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+HOTELS_RATE = float(os.getenv("HOTELS_RATE", "2"))
+HOTELS_BURST = int(os.getenv("HOTELS_BURST", "5"))
+HOTELS_MONTHLY_BUDGET = int(os.getenv("HOTELS_MONTHLY_BUDGET", "500"))
+HOTELS_BUDGET_THRESHOLD = float(os.getenv("HOTELS_BUDGET_THRESHOLD", "0.9"))
+HOTELS_QUOTA_PATH = os.getenv("HOTELS_QUOTA_PATH", ".cache/hotels/quota.json")
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> None:
+        self.refill()
+        while self.tokens < 1:
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+            self.refill()
+        self.tokens -= 1
+
+
+class RequestBudget:
+    def __init__(self, path: str, monthly_budget: int, threshold: float):
+        self.path = path
+        self.monthly_budget = monthly_budget
+        self.threshold = threshold
+        self.__state = None
+
+    @staticmethod
+    def get_month() -> str:
+        return datetime.date.today().strftime("%Y-%m")
+
+    @property
+    def state(self) -> dict:
+        if self.__state is None and os.path.exists(self.path):
+            with open(self.path, "r") as f:
+                self.__state = json.load(f)
+        if self.__state is None or self.__state["month"] != self.get_month():
+            self.__state = {"month": self.get_month(), "total": 0, "endpoints": {}}
+        return self.__state
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(f"{self.path}.tmp", "w") as f:
+            json.dump(self.state, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    @property
+    def is_degraded(self) -> bool:
+        return self.state["total"] >= self.monthly_budget * self.threshold
+
+    def record(self, endpoint: str) -> None:
+        state = self.state
+        state["total"] += 1
+        state["endpoints"][endpoint] = state["endpoints"].get(endpoint, 0) + 1
+        self.save()
+        if state["total"] == int(self.monthly_budget * self.threshold):
+            logger.warning(
+                f"Request budget threshold reached: {state['total']} of "
+                f"{self.monthly_budget} requests in {state['month']}"
+            )
+
+
+hotels_limiter = TokenBucket(HOTELS_RATE, HOTELS_BURST)
+hotels_budget = RequestBudget(
+    HOTELS_QUOTA_PATH, HOTELS_MONTHLY_BUDGET, HOTELS_BUDGET_THRESHOLD
+)
@@ -0,0 +1,159 @@
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+import io
+import logging
+import multiprocessing
+import os
+from typing import Awaitable, Callable
+
+from PIL import Image
+import staticmap
+
+from travel_bot.api import tiles
+
+logger = logging.getLogger(__name__)
+
+MAP_RENDER_EXECUTOR = os.getenv("MAP_RENDER_EXECUTOR", "process")
+MAP_RENDER_WORKERS = int(os.getenv("MAP_RENDER_WORKERS", "2"))
+MAP_RENDER_QUEUE_SIZE = int(os.getenv("MAP_RENDER_QUEUE_SIZE", "8"))
+MAP_IMAGE_FORMAT = os.getenv("MAP_IMAGE_FORMAT", "png").lower()
+MAP_IMAGE_QUALITY = int(os.getenv("MAP_IMAGE_QUALITY", "85"))
+MAP_WIDTH = 800
+MAP_HEIGHT = 600
+
+
+class RenderQueueFull(Exception):
+    pass
+
+
+def encode_image(img: Image.Image, image_format: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    match image_format:
+        case "jpeg" | "jpg":
+            img.convert("RGB").save(
+                buffer, format="JPEG", quality=quality, optimize=True
+            )
+        case "webp":
+            img.save(buffer, format="WEBP", quality=quality, method=4)
+        case _:
+            img.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def render_map(
+    lines: list[list[tuple[float, float]]],
+    width: int = MAP_WIDTH,
+    height: int = MAP_HEIGHT,
+    image_format: str = MAP_IMAGE_FORMAT,
+    quality: int = MAP_IMAGE_QUALITY,
+    store: tiles.TileStore | None = None,
+) -> tuple[bytes, dict]:
+    static_map = tiles.CachedStaticMap(width, height, store or tiles.tile_store)
+    for line in lines:
+        static_map.add_line(staticmap.Line(line, color="blue", width=5))
+    img = static_map.render()
+    return encode_image(img, image_format, quality), static_map.tile_stats()
+
+
+class MapRenderer:
+    def __init__(self, executor_type: str, workers: int, queue_size: int):
+        self.executor_type = executor_type
+        self.workers = workers
+        self.queue_size = queue_size
+
+        self.pending = 0
+        self.rendering = 0
+        self.status_tasks = set()
+        self.__executor = None
+        self.__slots = None
+
+    @property
+    def executor(self) -> Executor:
+        if self.__executor is None:
+            if self.executor_type == "process":
+                self.__executor = ProcessPoolExecutor(
+                    self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self.__executor = ThreadPoolExecutor(self.workers)
+        return self.__executor
+
+    @property
+    def slots(self) -> asyncio.Semaphore:
+        if self.__slots is None:
+            self.__slots = asyncio.Semaphore(self.workers)
+        return self.__slots
+
+    @property
+    def queued(self) -> int:
+        return self.pending - self.rendering
+
+    @property
+    def is_full(self) -> bool:
+        return self.pending >= self.queue_size
+
+    async def send_status(
+        self,
+        on_status: Callable[[str], Awaitable[None]],
+        status: str,
+        previous: asyncio.Task | None,
+    ) -> None:
+        # Statuses of one render arrive in order, a failed one doesn't stop the next
+        if previous is not None:
+            await asyncio.wait([previous])
+        try:
+            await on_status(status)
+        except Exception:
+            logger.warning(f"Map render status '{status}' not sent", exc_info=True)
+
+    def notify(
+        self,
+        on_status: Callable[[str], Awaitable[None]] | None,
+        status: str,
+        previous: asyncio.Task | None = None,
+    ) -> asyncio.Task | None:
+        # Status is sent in background, so a slot is never held during a network call
+        if on_status is None:
+            return None
+        task = asyncio.create_task(self.send_status(on_status, status, previous))
+        self.status_tasks.add(task)
+        task.add_done_callback(self.status_tasks.discard)
+        return task
+
+    async def render(
+        self,
+        lines: list[list[tuple[float, float]]],
+        on_status: Callable[[str], Awaitable[None]] | None = None,
+    ) -> bytes:
+        if self.is_full:
+            logger.warning(f"Map render queue is full ({self.pending} maps)")
+            raise RenderQueueFull()
+
+        self.pending += 1
+        try:
+            status_task = None
+            if self.slots.locked():
+                status_task = self.notify(on_status, f"queued, position {self.queued}")
+            async with self.slots:
+                self.rendering += 1
+                try:
+                    self.notify(on_status, "rendering", status_task)
+                    loop = asyncio.get_running_loop()
+                    img, tile_stats = await loop.run_in_executor(
+                        self.executor, render_map, lines
+                    )
+                finally:
+                    self.rendering -= 1
+        finally:
+            self.pending -= 1
+
+        await asyncio.to_thread(tiles.tile_store.record, **tile_stats)
+        return img
+
+    def shutdown(self) -> None:
+        if self.__executor is not None:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
+
+renderer = MapRenderer(MAP_RENDER_EXECUTOR, MAP_RENDER_WORKERS, MAP_RENDER_QUEUE_SIZE)
@@ -1,79 +1,183 @@
-import os
+import asyncio
+from typing import Awaitable, Callable
 
-import requests
+import numpy as np
 import polyline
-import staticmap
 
+from travel_bot.api import cache, geometry, http_client, render
+from travel_bot.api.single_flight import single_flight
 from travel_bot.db_models import city
 
+background_tasks = set()
 
-def get_borders(
-    coords: list[tuple[float, float]]
-) -> tuple[tuple[float, float], tuple[float, float]]:
-    coords.sort(key=lambda coord: coord[0])
 
-    min_x = min(coord[0] for coord in coords)
-    max_x = max(coord[0] for coord in coords)
+@single_flight
+async def get_route_legs(
+    coords: list[tuple[float, float]], profile: str = "driving"
+) -> list[dict]:
+    url = f"http://router.project-osrm.org/route/v1/{profile}/"
+    loc = ";".join(f"{lon},{lat}" for lon, lat in coords)
+    response = await http_client.get(
+        url + loc, params={"overview": "false", "steps": "true"}
+    )
 
-    coords.sort(key=lambda coord: coord[1])
+    if response is None or response.status_code != 200:
+        return []
 
-    min_y = min(coord[1] for coord in coords)
-    max_y = max(coord[1] for coord in coords)
+    json_data = response.json()
+    return [
+        {
+            "points": geometry.simplify(
+                [
+                    point
+                    for step in leg["steps"]
+                    for point in polyline.decode(step["geometry"])
+                ],
+                geometry.CACHE_TOLERANCE,
+            ),
+            "distance": leg["distance"],
+            "duration": leg["duration"],
+        }
+        for leg in json_data["routes"][0]["legs"]
+    ]
 
-    return (min_x, max_x), (min_y, max_y)
 
+def get_leg_key(from_city_id: int, to_city_id: int, profile: str) -> str:
+    return f"{from_city_id}_{to_city_id}_{profile}"
 
-def get_route(
-    start_lon: float, start_lat: float, end_lon: float, end_lat: float
-) -> list[tuple[float, float]]:
-    url = "http://router.project-osrm.org/route/v1/driving/"
-    loc = f"{start_lon},{start_lat};{end_lon},{end_lat}"
-    response = requests.get(url + loc)
 
-    if response.status_code != 200:
-        return []
+async def load_cached_leg(
+    from_city_id: int, to_city_id: int, profile: str
+) -> dict | None:
+    leg = await cache.cache.aget(
+        "route_legs", get_leg_key(from_city_id, to_city_id, profile)
+    )
+    if leg is None:
+        return None
+    return {**leg, "points": leg["points"].astype(np.float64)}
+
+
+async def save_cached_leg(
+    from_city_id: int, to_city_id: int, profile: str, leg: dict
+) -> None:
+    # float32 keeps ~1 m precision at half the size of float64
+    await cache.cache.aset(
+        "route_legs",
+        get_leg_key(from_city_id, to_city_id, profile),
+        {**leg, "points": np.asarray(leg["points"], dtype=np.float32)},
+    )
 
-    json_data = response.json()
-    route = polyline.decode(json_data["routes"][0]["geometry"])
-    return route
 
+async def get_trip_legs(
+    *travel_cities: city.City, profile: str = "driving"
+) -> list[dict]:
+    city_pairs = list(zip(travel_cities, travel_cities[1:]))
+    legs = await asyncio.gather(
+        *(
+            load_cached_leg(from_city.id, to_city.id, profile)
+            for from_city, to_city in city_pairs
+        )
+    )
 
-def get_png(*travel_cities: city.City) -> str:
-    coords = [
-        (travel_city.longitude, travel_city.latitude) for travel_city in travel_cities
-    ]
-    route_points = [
-        get_route(coords_1[0], coords_1[1], coords_2[0], coords_2[1])
-        for coords_1, coords_2 in zip(coords, coords[1:])
-    ]
+    # Consecutive uncached legs are fetched with one multi-waypoint request
+    missing_runs = []
+    for idx, leg in enumerate(legs):
+        if leg is not None:
+            continue
+        if missing_runs and missing_runs[-1][-1] == idx - 1:
+            missing_runs[-1].append(idx)
+        else:
+            missing_runs.append([idx])
+
+    fetched_runs = await http_client.gather_limited(
+        *(
+            get_route_legs(
+                [
+                    (travel_city.longitude, travel_city.latitude)
+                    for travel_city in travel_cities[run[0] : run[-1] + 2]
+                ],
+                profile,
+            )
+            for run in missing_runs
+        )
+    )
+    for run, fetched_legs in zip(missing_runs, fetched_runs):
+        if len(fetched_legs) != len(run):
+            return []
+        for idx, leg in zip(run, fetched_legs):
+            from_city, to_city = city_pairs[idx]
+            await save_cached_leg(from_city.id, to_city.id, profile, leg)
+            legs[idx] = leg
+
+    return legs
+
+
+async def get_png(
+    *travel_cities: city.City,
+    legs: list[dict] | None = None,
+    on_status: Callable[[str], Awaitable[None]] | None = None,
+) -> bytes:
+    if legs is None:
+        legs = await get_trip_legs(*travel_cities)
+    legs_points = [leg["points"] for leg in legs if len(leg["points"])]
+    # Polyline points are (lat, lon)
+    tolerance = geometry.get_zoom_tolerance(
+        geometry.flip(np.concatenate(legs_points)), render.MAP_WIDTH, render.MAP_HEIGHT
+    )
     route_points = [
-        list(map(lambda x: x[::-1], city_points)) for city_points in route_points
+        geometry.flip(geometry.simplify(points, tolerance)).tolist()
+        for points in legs_points
     ]
 
-    static_map = staticmap.StaticMap(800, 600)
-    for city_route in route_points:
-        static_map.add_line(staticmap.Line(city_route, color="blue", width=5))
-    img = static_map.render()
-    img.save(
-        f".cache/maps/map_{'-'.join(str(travel_city.id) for travel_city in travel_cities)}.png"
-    )
-    return f".cache/maps/map_{'-'.join(str(travel_city.id) for travel_city in travel_cities)}.png"
-
-
-def get_map_png(*travel_cities: city.City) -> bytes:
-    if not os.path.exists(f".cache/maps"):
-        os.makedirs(f".cache/maps")
-    if os.path.exists(
-        f".cache/maps/map_{'-'.join(str(travel_city.id) for travel_city in travel_cities)}.png"
-    ):
-        with open(
-            f".cache/maps/map_{'-'.join(str(travel_city.id) for travel_city in travel_cities)}.png",
-            "rb",
-        ) as photo:
-            img = photo.read()
+    return await render.renderer.render(route_points, on_status)
+
+
+def get_map_key(*travel_cities: city.City) -> str:
+    return "-".join(str(travel_city.id) for travel_city in travel_cities)
+
+
+def get_map_image_key(map_key: str) -> str:
+    return f"{map_key}.{render.MAP_IMAGE_FORMAT}"
+
+
+async def get_map_png(
+    *travel_cities: city.City,
+    legs: list[dict] | None = None,
+    on_status: Callable[[str], Awaitable[None]] | None = None,
+) -> bytes:
+    image_key = get_map_image_key(get_map_key(*travel_cities))
+    img = await cache.cache.aget("maps", image_key)
+    if img is not None:
         return img
 
-    map_path = get_png(*travel_cities)
-    with open(map_path, "rb") as photo:
-        img = photo.read()
+    img = await get_png(*travel_cities, legs=legs, on_status=on_status)
+    save_task = asyncio.create_task(cache.cache.aset("maps", image_key, img))
+    background_tasks.add(save_task)
+    save_task.add_done_callback(background_tasks.discard)
     return img
+
+
+async def get_map_file_id(map_key: str) -> str | None:
+    return await cache.cache.aget("map_file_ids", map_key)
+
+
+async def save_map_file_id(map_key: str, file_id: str | None) -> None:
+    if file_id is None:
+        await cache.cache.adelete("map_file_ids", map_key)
+    else:
+        await cache.cache.aset("map_file_ids", map_key, file_id)
+
+
+async def get_trip_map(
+    *travel_cities: city.City,
+    on_status: Callable[[str], Awaitable[None]] | None = None,
+) -> tuple[str | bytes | None, list[dict]]:
+    legs = await get_trip_legs(*travel_cities)
+    if not legs:
+        return None, []
+
+    # Maps already sent to Telegram are resent by file_id, without an upload
+    file_id = await get_map_file_id(get_map_key(*travel_cities))
+    if file_id is not None:
+        return file_id, legs
+    return await get_map_png(*travel_cities, legs=legs, on_status=on_status), legs
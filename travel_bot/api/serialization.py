@@ -0,0 +1,148 @@
+import base64
+import json
+import os
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CACHE_CODEC = os.getenv("CACHE_CODEC", "msgpack" if msgpack is not None else "json")
+CACHE_ZSTD_LEVEL = int(os.getenv("CACHE_ZSTD_LEVEL", "3"))
+# Smaller payloads are stored uncompressed, zstd frame overhead isn't worth it
+CACHE_COMPRESS_MIN_SIZE = int(os.getenv("CACHE_COMPRESS_MIN_SIZE", "512"))
+
+# Every encoded value starts with one byte telling how to decode it,
+# so entries written with another codec stay readable after switching
+BYTES_PREFIX, JSON_PREFIX, MSGPACK_PREFIX, ZSTD_PREFIX = b"B", b"J", b"M", b"Z"
+MSGPACK_ARRAY_EXT = 1
+
+
+def encode_json_default(value) -> dict:
+    if isinstance(value, np.ndarray):
+        return {
+            "__ndarray__": value.dtype.str,
+            "shape": list(value.shape),
+            "data": base64.b64encode(value.tobytes()).decode(),
+        }
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, bytes):
+        return {"__bytes__": base64.b64encode(value).decode()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def decode_json_object(value: dict):
+    if "__bytes__" in value:
+        return base64.b64decode(value["__bytes__"])
+    if "__ndarray__" not in value:
+        return value
+    return np.frombuffer(
+        base64.b64decode(value["data"]), dtype=np.dtype(value["__ndarray__"])
+    ).reshape(value["shape"])
+
+
+class JsonCodec:
+    prefix = JSON_PREFIX
+
+    @staticmethod
+    def encode(value) -> bytes:
+        return json.dumps(
+            value, default=encode_json_default, separators=(",", ":")
+        ).encode()
+
+    @staticmethod
+    def decode(data: bytes):
+        return json.loads(data, object_hook=decode_json_object)
+
+
+def encode_msgpack_array(value):
+    if isinstance(value, np.ndarray):
+        return msgpack.ExtType(
+            MSGPACK_ARRAY_EXT,
+            msgpack.packb((value.dtype.str, value.shape, value.tobytes())),
+        )
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not serializable")
+
+
+def decode_msgpack_array(code: int, data: bytes):
+    if code != MSGPACK_ARRAY_EXT:
+        return msgpack.ExtType(code, data)
+    dtype, shape, buffer = msgpack.unpackb(data)
+    return np.frombuffer(buffer, dtype=np.dtype(dtype)).reshape(shape)
+
+
+class MsgpackCodec:
+    prefix = MSGPACK_PREFIX
+
+    @staticmethod
+    def encode(value) -> bytes:
+        return msgpack.packb(value, default=encode_msgpack_array)
+
+    @staticmethod
+    def decode(data: bytes):
+        return msgpack.unpackb(
+            data, ext_hook=decode_msgpack_array, strict_map_key=False
+        )
+
+
+CODECS = {"json": JsonCodec, "msgpack": MsgpackCodec}
+PREFIX_CODECS = {JSON_PREFIX: JsonCodec, MSGPACK_PREFIX: MsgpackCodec}
+
+
+def get_codec(name: str):
+    if name == "msgpack" and msgpack is None:
+        raise RuntimeError("msgpack codec requires the msgpack package")
+    return CODECS[name]
+
+
+class Serializer:
+    def __init__(self, codec, zstd_level: int = 0):
+        self.codec = codec
+        self.zstd_level = zstd_level if zstandard is not None else 0
+        self.__compressor = None
+        self.__decompressor = None
+
+    def compress(self, data: bytes) -> bytes:
+        if self.__compressor is None:
+            self.__compressor = zstandard.ZstdCompressor(level=self.zstd_level)
+        return self.__compressor.compress(data)
+
+    def decompress(self, data: bytes) -> bytes:
+        if zstandard is None:
+            raise RuntimeError("Cached value is zstd compressed, zstandard is missing")
+        if self.__decompressor is None:
+            self.__decompressor = zstandard.ZstdDecompressor()
+        return self.__decompressor.decompress(data)
+
+    def encode(self, value) -> bytes:
+        # Raw bytes (images, packed buffers) are stored as is
+        if isinstance(value, bytes):
+            return BYTES_PREFIX + value
+        data = self.codec.prefix + self.codec.encode(value)
+        if self.zstd_level and len(data) >= CACHE_COMPRESS_MIN_SIZE:
+            return ZSTD_PREFIX + self.compress(data)
+        return data
+
+    def decode(self, data: bytes):
+        prefix = data[:1]
+        if prefix == BYTES_PREFIX:
+            return data[1:]
+        if prefix == ZSTD_PREFIX:
+            return self.decode(self.decompress(data[1:]))
+        if prefix == MSGPACK_PREFIX and msgpack is None:
+            raise RuntimeError("Cached value is msgpack encoded, msgpack is missing")
+        return PREFIX_CODECS[prefix].decode(data[1:])
+
+
+def get_serializer(name: str = CACHE_CODEC, zstd_level: int = CACHE_ZSTD_LEVEL):
+    return Serializer(get_codec(name), zstd_level)
@@ -0,0 +1,39 @@
+import asyncio
+import functools
+import logging
+from typing import Awaitable, Callable, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_key(value) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((key, normalize_key(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_key(item) for item in value)
+    return value
+
+
+def single_flight(func: Callable[..., Awaitable]) -> Callable[..., Awaitable]:
+    calls: dict[Hashable, asyncio.Task] = {}
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        key = normalize_key((args, kwargs))
+        task = calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            calls[key] = task
+
+            def forget(done_task: asyncio.Task) -> None:
+                if calls.get(key) is done_task:
+                    del calls[key]
+
+            task.add_done_callback(forget)
+        else:
+            logger.debug(f"Joined in-flight {func.__name__} call")
+
+        # Shielded, so one caller giving up does not cancel the shared call
+        return await asyncio.shield(task)
+
+    return wrapper
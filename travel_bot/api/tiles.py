@@ -0,0 +1,150 @@
+import io
+import logging
+import os
+import re
+import threading
+
+from PIL import Image
+import staticmap
+
+logger = logging.getLogger(__name__)
+
+MAP_TILES_DIR = os.getenv("MAP_TILES_DIR", ".cache/tiles")
+MAP_TILES_MAX_SIZE = int(os.getenv("MAP_TILES_MAX_SIZE", str(512 * 1024 * 1024)))
+MAP_TILES_OFFLINE = os.getenv("MAP_TILES_OFFLINE", "0") == "1"
+TILE_URL_TEMPLATE = "https://a.tile.openstreetmap.org/{z}/{x}/{y}.png"
+TILE_URL_PATTERN = re.compile(r"/(\d+)/(\d+)/(\d+)\.png$")
+
+
+def get_blank_tile() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGBA", (256, 256), (0, 0, 0, 0)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class TileStore:
+    def __init__(self, root: str, max_size: int, offline: bool = False):
+        self.root = root
+        self.max_size = max_size
+        self.offline = offline
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__size = None
+        self.__lock = threading.Lock()
+
+    def get_path(self, z: int, x: int, y: int) -> str:
+        return os.path.join(self.root, str(z), str(x), f"{y}.png")
+
+    def get(self, z: int, x: int, y: int) -> bytes | None:
+        path = self.get_path(z, x, y)
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+
+        # Modification time doubles as the last access time for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return content
+
+    def put(self, z: int, x: int, y: int, content: bytes) -> None:
+        path = self.get_path(z, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def record(self, hits: int, misses: int, written: int) -> None:
+        # Renders may run in worker processes, so counters, size and eviction
+        # are kept by the main process from what each render reports
+        with self.__lock:
+            self.hits += hits
+            self.misses += misses
+            if written:
+                self.__size = self.get_size() + written
+                if self.__size > self.max_size:
+                    self.evict()
+
+    def get_size(self) -> int:
+        if self.__size is None:
+            self.__size = sum(size for _, _, size in self.scan())
+        return self.__size
+
+    def scan(self) -> list[tuple[float, str, int]]:
+        tiles = []
+        for dir_path, _, file_names in os.walk(self.root):
+            for file_name in file_names:
+                if not file_name.endswith(".png"):
+                    continue
+                path = os.path.join(dir_path, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                tiles.append((stat.st_mtime, path, stat.st_size))
+        return tiles
+
+    def evict(self) -> None:
+        # Evict down to 90% of the cap, so eviction scans stay rare
+        target_size = self.max_size * 0.9
+        tiles = sorted(self.scan())
+        size = sum(tile_size for _, _, tile_size in tiles)
+        for _, path, tile_size in tiles:
+            if size <= target_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            size -= tile_size
+            self.evictions += 1
+        self.__size = size
+        logger.info(f"Tile cache evicted down to {size} bytes")
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": self.get_size(),
+        }
+
+
+class CachedStaticMap(staticmap.StaticMap):
+    def __init__(self, width: int, height: int, store: TileStore, **kwargs):
+        super().__init__(width, height, url_template=TILE_URL_TEMPLATE, **kwargs)
+        self.store = store
+
+        # Tile usage of this map only, see TileStore.record
+        self.hits = 0
+        self.misses = 0
+        self.written = 0
+
+    def get(self, url: str, **kwargs) -> tuple[int | None, bytes | None]:
+        z, x, y = map(int, TILE_URL_PATTERN.search(url).groups())
+        content = self.store.get(z, x, y)
+        if content is not None:
+            self.hits += 1
+            return 200, content
+        self.misses += 1
+        if self.store.offline:
+            return 200, BLANK_TILE
+
+        status_code, content = super().get(url, **kwargs)
+        if status_code == 200:
+            self.store.put(z, x, y, content)
+            self.written += len(content)
+        return status_code, content
+
+    def tile_stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "written": self.written}
+
+
+BLANK_TILE = get_blank_tile()
+tile_store = TileStore(MAP_TILES_DIR, MAP_TILES_MAX_SIZE, MAP_TILES_OFFLINE)
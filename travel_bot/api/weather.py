@@ -1,33 +1,71 @@
+import asyncio
 import datetime
-import requests
-import os
-import json
 import logging
+import os
+import time
+
+import numpy as np
 
+from travel_bot.api import cache, climate, http_client
+from travel_bot.api.single_flight import single_flight
 from travel_bot.db_models import travel
 
 logger = logging.getLogger(__name__)
 
+FORECAST_DAYS = 14
+WEATHER_BATCH_SIZE = 50
+# (max days ahead, seconds): near days change more often between model runs
+WEATHER_TTL = ((1, 3 * 3600), (3, 6 * 3600), (7, 12 * 3600))
+WEATHER_DEFAULT_TTL = 24 * 3600
+WEATHER_MAX_STALE = int(os.getenv("WEATHER_MAX_STALE", str(2 * 24 * 3600)))
+# Past days of travels in progress are kept and shown this far back
+WEATHER_HISTORY_DAYS = int(os.getenv("WEATHER_HISTORY_DAYS", "31"))
+# Degrees, close to the resolution of the Open-Meteo forecast models
+WEATHER_GRID_RESOLUTION = float(os.getenv("WEATHER_GRID_RESOLUTION", "0.1"))
+
+WEATHER_FIELDS = ("max_temp", "min_temp", "precip")
+
+refreshing = set()
+background_tasks = set()
+
+
+def get_forecast_window(
+    user_travel: "travel.Travel",
+) -> tuple[datetime.date, datetime.date] | None:
+    today = datetime.date.today()
+    horizon = today + datetime.timedelta(days=FORECAST_DAYS)
+    start_date = max(
+        user_travel.start_date, today - datetime.timedelta(days=WEATHER_HISTORY_DAYS)
+    )
+    end_date = min(user_travel.end_date, horizon)
+    if start_date > end_date:
+        return None
+    return start_date, end_date
 
-def get_weather_in_city(
-    lat: float, lon: float, start_date: datetime.date, end_date: datetime.date
-) -> dict:
-    start_date = datetime.date.strftime(start_date, "%Y-%m-%d")
-    end_date = datetime.date.strftime(end_date, "%Y-%m-%d")
-    if os.path.exists(
-        f".cache/weather/weather_{lat}_{lon}_{start_date}_{end_date}.json"
-    ):
-        with open(
-            f".cache/weather/weather_{lat}_{lon}_{start_date}_{end_date}.json", "r"
-        ) as f:
-            return json.load(f)
 
+def parse_forecast(forecast: dict) -> dict:
+    weather = {"weather": {}, "info": {"error": None, "error_code": 0}}
+    days, temp_max, temp_min, precip = (
+        forecast["daily"]["time"],
+        forecast["daily"]["temperature_2m_max"],
+        forecast["daily"]["temperature_2m_min"],
+        forecast["daily"]["precipitation_probability_max"],
+    )
+    for day, tmax, tmin, precip in zip(days, temp_max, temp_min, precip):
+        weather["weather"][day] = {"max_temp": tmax, "min_temp": tmin, "precip": precip}
+    return weather
+
+
+@single_flight
+async def fetch_forecasts(
+    coords: list[tuple[float, float]], start_date: str, end_date: str
+) -> list[dict]:
     base_url = r"https://api.open-meteo.com/v1/forecast"
-    response = requests.get(
+    response = await http_client.get(
         base_url,
         params={
-            "latitude": lat,
-            "longitude": lon,
+            "latitude": ",".join(str(lat) for lat, _ in coords),
+            "longitude": ",".join(str(lon) for _, lon in coords),
             "start_date": start_date,
             "end_date": end_date,
             "daily": [
@@ -37,55 +75,303 @@ def get_weather_in_city(
             ],
         },
     )
+    if response is None:
+        error = {"weather": {}, "info": {"error": "API unavailable", "error_code": 1}}
+        return [error] * len(coords)
     response = response.json()
     if "error" in response:
-        return {"weather": {}, "info": {"error": response["reason"], "error_code": 1}}
+        error = {"weather": {}, "info": {"error": response["reason"], "error_code": 1}}
+        return [error] * len(coords)
 
-    weather = {"weather": {}, "info": {"error": None, "error_code": 0}}
-    days, temp_max, temp_min, precip = (
-        response["daily"]["time"],
-        response["daily"]["temperature_2m_max"],
-        response["daily"]["temperature_2m_min"],
-        response["daily"]["precipitation_probability_max"],
+    # Open-Meteo returns a single object for one location and a list for several
+    forecasts = response if isinstance(response, list) else [response]
+    return [parse_forecast(forecast) for forecast in forecasts]
+
+
+def get_days(start_date: datetime.date, end_date: datetime.date) -> list[str]:
+    return [
+        datetime.date.strftime(start_date + datetime.timedelta(days=idx), "%Y-%m-%d")
+        for idx in range((end_date - start_date).days + 1)
+    ]
+
+
+def pack_weather_store(store: dict) -> dict:
+    # Stored column-wise as typed series, missing values become NaN
+    days = sorted(store)
+    packed = {
+        field: np.array(
+            [
+                np.nan if store[day].get(field) is None else store[day][field]
+                for day in days
+            ],
+            dtype=np.float32,
+        )
+        for field in WEATHER_FIELDS
+    }
+    packed["days"] = days
+    packed["fetched_at"] = np.array(
+        [store[day].get("fetched_at", 0) for day in days], dtype=np.float64
     )
-    for day, tmax, tmin, precip in zip(days, temp_max, temp_min, precip):
-        weather["weather"][day] = {"max_temp": tmax, "min_temp": tmin, "precip": precip}
+    return packed
 
-    if not os.path.exists(".cache/weather"):
-        os.makedirs(".cache/weather")
-    with open(
-        f".cache/weather/weather_{lat}_{lon}_{start_date}_{end_date}.json", "w"
-    ) as f:
-        json.dump(weather, f)
 
-    return weather
+def unpack_weather_store(packed: dict) -> dict:
+    store = {day: {} for day in packed["days"]}
+    for field in WEATHER_FIELDS:
+        for day, value in zip(packed["days"], packed[field].tolist()):
+            store[day][field] = None if np.isnan(value) else round(value, 2)
+    for day, fetched_at in zip(packed["days"], packed["fetched_at"].tolist()):
+        store[day]["fetched_at"] = fetched_at
+    return store
+
+
+async def load_weather_store(lat: float, lon: float) -> dict:
+    packed = await cache.cache.aget("weather", f"{lat}_{lon}")
+    if packed is None:
+        return {}
+    return unpack_weather_store(packed)
+
+
+async def save_weather_store(lat: float, lon: float, store: dict) -> None:
+    # A store untouched for longer than the max staleness has nothing servable left
+    keep_from = datetime.date.strftime(
+        datetime.date.today() - datetime.timedelta(days=WEATHER_HISTORY_DAYS),
+        "%Y-%m-%d",
+    )
+    await cache.cache.aset(
+        "weather",
+        f"{lat}_{lon}",
+        pack_weather_store({day: store[day] for day in store if day >= keep_from}),
+        ttl=WEATHER_MAX_STALE,
+    )
+
+
+async def load_weather_stores(coords: list[tuple[float, float]]) -> dict:
+    stores = await asyncio.gather(
+        *(load_weather_store(lat, lon) for lat, lon in coords)
+    )
+    return dict(zip(coords, stores))
+
+
+def snap_to_grid(lat: float, lon: float) -> tuple[float, float]:
+    # Adding 0.0 turns -0.0 into 0.0, so both map to the same cache key
+    return (
+        round(round(lat / WEATHER_GRID_RESOLUTION) * WEATHER_GRID_RESOLUTION, 6) + 0.0,
+        round(round(lon / WEATHER_GRID_RESOLUTION) * WEATHER_GRID_RESOLUTION, 6) + 0.0,
+    )
+
+
+def get_weather_ttl(day: str) -> int:
+    days_ahead = (datetime.date.fromisoformat(day) - datetime.date.today()).days
+    for max_days_ahead, ttl in WEATHER_TTL:
+        if days_ahead <= max_days_ahead:
+            return ttl
+    return WEATHER_DEFAULT_TTL
+
+
+def get_day_age(store: dict, day: str, now: float) -> float | None:
+    if day not in store:
+        return None
+    return now - store[day].get("fetched_at", 0)
+
+
+async def update_weather_stores(
+    coords: list[tuple[float, float]], start_date: str, end_date: str, stores: dict
+) -> dict:
+    batches = [
+        coords[idx : idx + WEATHER_BATCH_SIZE]
+        for idx in range(0, len(coords), WEATHER_BATCH_SIZE)
+    ]
+    fetched_batches = await http_client.gather_limited(
+        *(fetch_forecasts(batch, start_date, end_date) for batch in batches)
+    )
+
+    errors = {}
+    fetched_at = time.time()
+    for batch, forecasts in zip(batches, fetched_batches):
+        for (lat, lon), weather in zip(batch, forecasts):
+            if weather["info"]["error_code"] != 0:
+                errors[(lat, lon)] = weather
+                continue
+            for day, day_weather in weather["weather"].items():
+                stores[(lat, lon)][day] = {**day_weather, "fetched_at": fetched_at}
+            await save_weather_store(lat, lon, stores[(lat, lon)])
+    return errors
+
+
+async def refresh_weather_stores(
+    coords: list[tuple[float, float]], start_date: str, end_date: str
+) -> None:
+    try:
+        stores = await load_weather_stores(coords)
+        errors = await update_weather_stores(coords, start_date, end_date, stores)
+        if errors:
+            logger.warning(f"Weather refresh failed for {len(errors)} locations")
+    finally:
+        refreshing.difference_update(coords)
+
+
+async def get_weather_in_cities(
+    coords: list[tuple[float, float]],
+    start_date: datetime.date,
+    end_date: datetime.date,
+) -> list[dict]:
+    days = get_days(start_date, end_date)
+    # Cities in one grid cell share a single stored and fetched forecast
+    grid_coords = [snap_to_grid(lat, lon) for lat, lon in coords]
+    stores = await load_weather_stores(grid_coords)
+    now = time.time()
+    today = datetime.date.strftime(datetime.date.today(), "%Y-%m-%d")
+
+    # Days that are absent or too old to serve are fetched before answering,
+    # merely stale days are served as is and refreshed in the background
+    missing_days, stale_days = {}, {}
+    for coord, store in stores.items():
+        missing_days[coord], stale_days[coord] = [], []
+        for day in days:
+            age = get_day_age(store, day, now)
+            if age is None:
+                missing_days[coord].append(day)
+            elif day < today:
+                # Weather of past days doesn't change, stored data stays servable
+                continue
+            elif age > WEATHER_MAX_STALE:
+                missing_days[coord].append(day)
+            elif age > get_weather_ttl(day):
+                stale_days[coord].append(day)
 
+    missing = [coord for coord in stores if missing_days[coord]]
+    errors = {}
+    if missing:
+        errors = await update_weather_stores(
+            missing,
+            min(missing_days[coord][0] for coord in missing),
+            max(missing_days[coord][-1] for coord in missing),
+            stores,
+        )
+
+    stale = [
+        coord for coord in stores if stale_days[coord] and coord not in refreshing
+    ]
+    if stale:
+        refreshing.update(stale)
+        refresh_task = asyncio.create_task(
+            refresh_weather_stores(
+                stale,
+                min(stale_days[coord][0] for coord in stale),
+                max(stale_days[coord][-1] for coord in stale),
+            )
+        )
+        background_tasks.add(refresh_task)
+        refresh_task.add_done_callback(background_tasks.discard)
 
-def get_weather(user_travel: "travel.Travel") -> dict:
-    if user_travel.start_date > datetime.date.today() + datetime.timedelta(days=14):
-        return {
-            "weather": {},
-            "info": {"error": "Weather data is not available yet", "error_code": 1},
+    results = {}
+    for coord, store in stores.items():
+        if coord in errors:
+            results[coord] = errors[coord]
+            continue
+        results[coord] = {
+            "weather": {
+                day: {
+                    key: value
+                    for key, value in store[day].items()
+                    if key != "fetched_at"
+                }
+                for day in days
+                if day in store
+            },
+            "info": {"error": None, "error_code": 0},
         }
-    end_date = user_travel.end_date
-    if end_date > datetime.date.today() + datetime.timedelta(days=14):
-        end_date = datetime.date.today() + datetime.timedelta(days=14)
+    return [results[coord] for coord in grid_coords]
 
-    response = {"weather": {}, "info": {"error": None, "error_code": 0}}
-    for loc in user_travel.locations:
-        weather = get_weather_in_city(
-            loc.latitude, loc.longitude, user_travel.start_date, end_date
+
+async def get_weather_for_travels(user_travels: list["travel.Travel"]) -> list[dict]:
+    windows = [get_forecast_window(user_travel) for user_travel in user_travels]
+
+    # One window covering every travel, so all locations share one request
+    forecasts = {}
+    active_windows = [window for window in windows if window is not None]
+    if active_windows:
+        coords = list(
+            dict.fromkeys(
+                (loc.latitude, loc.longitude)
+                for user_travel, window in zip(user_travels, windows)
+                if window is not None
+                for loc in user_travel.locations
+            )
+        )
+        locations_weather = await get_weather_in_cities(
+            coords,
+            min(start_date for start_date, _ in active_windows),
+            max(end_date for _, end_date in active_windows),
+        )
+        forecasts = dict(zip(coords, locations_weather))
+
+    responses = []
+    for user_travel, window in zip(user_travels, windows):
+        if window is None:
+            responses.append(
+                {
+                    "weather": {},
+                    "info": {
+                        "error": "Weather data is not available yet",
+                        "error_code": 1,
+                    },
+                }
+            )
+            continue
+
+        start_date, end_date = (
+            datetime.date.strftime(window_date, "%Y-%m-%d") for window_date in window
         )
-        if weather["info"]["error_code"] != 0:
-            logger.warning(f"Weather API error: {weather['info']['error_code']}")
-            return {"weather": {}, "info": {"error": "API error", "error_code": 2}}
-        response["weather"][loc.name] = weather["weather"]
+        response = {"weather": {}, "info": {"error": None, "error_code": 0}}
+        for loc in user_travel.locations:
+            weather = forecasts[(loc.latitude, loc.longitude)]
+            if weather["info"]["error_code"] != 0:
+                logger.warning(f"Weather API error: {weather['info']['error_code']}")
+                response = {
+                    "weather": {},
+                    "info": {"error": "API error", "error_code": 2},
+                }
+                break
+            response["weather"][loc.name] = {
+                day: day_weather
+                for day, day_weather in weather["weather"].items()
+                if start_date <= day <= end_date
+            }
+        responses.append(response)
+
+    return responses
+
+
+async def get_weather(user_travel: "travel.Travel") -> dict:
+    return (await get_weather_for_travels([user_travel]))[0]
 
+
+def get_expected_weather(user_travel: "travel.Travel") -> dict:
+    response = {
+        "weather": {},
+        "info": {"error": None, "error_code": 0, "source": "climate"},
+    }
+    for loc in user_travel.locations:
+        expected_weather = climate.get_expected_weather(
+            loc.latitude, loc.longitude, user_travel.start_date, user_travel.end_date
+        )
+        if expected_weather is None:
+            return {
+                "weather": {},
+                "info": {"error": "Weather data is not available yet", "error_code": 1},
+            }
+        response["weather"][loc.name] = {**expected_weather, "rainy_days": []}
     return response
 
 
-def get_short_weather(user_travel: "travel.Travel") -> dict:
-    weather_data = get_weather(user_travel)
+async def get_short_weather(user_travel: "travel.Travel") -> dict:
+    # Beyond the forecast horizon fall back to local monthly climate normals
+    if get_forecast_window(user_travel) is None:
+        return get_expected_weather(user_travel)
+
+    weather_data = await get_weather(user_travel)
     if weather_data["info"]["error_code"] != 0:
         return weather_data
 
@@ -35,7 +35,7 @@ async def name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     tg_user = update.effective_user
     travel_name = update.message.text
 
-    if not validate_travel_name(travel_name, tg_user.id):
+    if not await validate_travel_name(travel_name, tg_user.id):
         await update.message.reply_html("Sorry, name is invalid")
         return NAME
 
@@ -72,7 +72,7 @@ async def locations(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         )
         return START_DATE
 
-    loc_is_valid, hints = validate_city(location)
+    loc_is_valid, hints = await validate_city(location)
 
     if not loc_is_valid:
         response = "Sorry, location is invalid\n"
@@ -83,7 +83,7 @@ async def locations(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         await update.message.reply_html(response)
         return LOCATIONS
 
-    found_locations = city.City.get_cities_by_name(location)
+    found_locations = await city.City.get_cities_by_name(location, load=("country",))
     if len(found_locations) == 1:
         context.user_data["travel_locations"].append(found_locations[0])
         await update.message.reply_html("Location added")
@@ -133,7 +133,7 @@ async def end_date(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
     context.user_data["travel_end_date"] = travel_end_date
 
-    new_travel = travel.Travel.create_travel(
+    new_travel = await travel.Travel.create_travel(
         owner_id=update.effective_user.id,
         name=context.user_data["travel_name"],
         description=context.user_data["travel_description"],
@@ -146,7 +146,7 @@ async def end_date(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     )
 
     for loc in context.user_data["travel_locations"]:
-        travel.Travel.add_location(new_travel.id, loc.id)
+        await travel.Travel.add_location(new_travel.id, loc.id)
 
     await update.message.reply_html(
         "Now you can invite other users "
@@ -170,14 +170,14 @@ async def invite(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         )
         return ConversationHandler.END
 
-    invited_user = user.User.get_user_by_tg_username(invited_user_name)
+    invited_user = await user.User.get_user_by_tg_username(invited_user_name)
     if invited_user is None:
         await update.message.reply_html(
             "Sorry user is not found. Maybe user is not registered"
         )
         return INVITE
 
-    travel.Travel.invite_user(context.user_data["new_travel"].id, invited_user.id)
+    await travel.Travel.invite_user(context.user_data["new_travel"].id, invited_user.id)
     await update.message.reply_html("User invited")
     return INVITE
 
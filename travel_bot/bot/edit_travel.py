@@ -38,7 +38,9 @@ LEAVE_TRAVEL = 11
 
 @must_have_travels
 async def choose_travel_edit(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    db_user = user.User.get_user_by_tg_id(update.effective_user.id)
+    db_user = await user.User.get_user_by_tg_id(
+        update.effective_user.id, load=("travels",)
+    )
     available_travels = db_user.travels
 
     if not available_travels:
@@ -63,7 +65,9 @@ async def choose_travel_edit(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
 async def choose_column(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     travel_name = update.message.text
-    edited_travel = travel.Travel.get_user_travel(travel_name, update.effective_user.id)
+    edited_travel = await travel.Travel.get_user_travel(
+        travel_name, update.effective_user.id
+    )
     if edited_travel is None:
         await update.message.reply_html("Sorry, travel name is invalid")
         return CHOOSE_COLUMN
@@ -89,8 +93,10 @@ async def choose_column(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
 
 
 async def edit_column(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    edited_travel = travel.Travel.get_user_travel(
-        context.user_data["edited_travel_name"], update.effective_user.id
+    edited_travel = await travel.Travel.get_user_travel(
+        context.user_data["edited_travel_name"],
+        update.effective_user.id,
+        load=("locations", "invited_users"),
     )
     match update.message.text.lower():
         case "name":
@@ -106,7 +112,7 @@ async def edit_column(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
             )
             return DESCRIPTION
         case "locations":
-            travel.Travel.remove_locations(edited_travel.id)
+            await travel.Travel.remove_locations(edited_travel.id)
             await update.message.reply_html(
                 f"Current locations ({', '.join([loc.name for loc in edited_travel.locations])}) deleted. Enter new locations. Send 'end' when you're done",
                 reply_markup=ReplyKeyboardRemove(),
@@ -119,7 +125,7 @@ async def edit_column(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
             )
             return START_DATE
         case "invited users":
-            travel.Travel.remove_users(edited_travel.id)
+            await travel.Travel.remove_users(edited_travel.id)
             await update.message.reply_html(
                 f"Current invited users ({', '.join([user.username for user in edited_travel.invited_users])}) deleted. Invite new users. Send 'end' when you're done",
                 reply_markup=ReplyKeyboardRemove(),
@@ -161,18 +167,18 @@ async def edit_column(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
 
 
 async def edit_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    edited_travel = travel.Travel.get_user_travel(
+    edited_travel = await travel.Travel.get_user_travel(
         context.user_data["edited_travel_name"], update.effective_user.id
     )
     new_name = update.message.text
     if (
-        not validate_travel_name(new_name, update.effective_user.id)
+        not await validate_travel_name(new_name, update.effective_user.id)
         and new_name != edited_travel.name
     ):
         await update.message.reply_html("Sorry, name is invalid")
         return NAME
 
-    travel.Travel.edit_value(edited_travel.id, "name", new_name)
+    await travel.Travel.edit_value(edited_travel.id, "name", new_name)
 
     reply_keyboard = [
         [option]
@@ -194,7 +200,7 @@ async def edit_name(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
 
 async def edit_description(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    edited_travel = travel.Travel.get_user_travel(
+    edited_travel = await travel.Travel.get_user_travel(
         context.user_data["edited_travel_name"], update.effective_user.id
     )
     new_description = update.message.text
@@ -202,7 +208,7 @@ async def edit_description(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         await update.message.reply_html("Sorry, description is invalid")
         return DESCRIPTION
 
-    travel.Travel.edit_value(edited_travel.id, "description", new_description)
+    await travel.Travel.edit_value(edited_travel.id, "description", new_description)
 
     reply_keyboard = [
         [option]
@@ -224,8 +230,10 @@ async def edit_description(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 
 
 async def edit_locations(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    edited_travel = travel.Travel.get_user_travel(
-        context.user_data["edited_travel_name"], update.effective_user.id
+    edited_travel = await travel.Travel.get_user_travel(
+        context.user_data["edited_travel_name"],
+        update.effective_user.id,
+        load=("locations",),
     )
     location = update.message.text
 
@@ -252,7 +260,7 @@ async def edit_locations(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
         return EDIT_COLUMN
 
-    loc_is_valid, hints = validate_city(location)
+    loc_is_valid, hints = await validate_city(location)
 
     if not loc_is_valid:
         response = "Sorry, location is invalid\n"
@@ -263,9 +271,9 @@ async def edit_locations(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         await update.message.reply_html(response)
         return LOCATIONS
 
-    found_locations = city.City.get_cities_by_name(location)
+    found_locations = await city.City.get_cities_by_name(location, load=("country",))
     if len(found_locations) == 1:
-        travel.Travel.add_location(edited_travel.id, found_locations[0].id)
+        await travel.Travel.add_location(edited_travel.id, found_locations[0].id)
         await update.message.reply_html("Location added")
         return LOCATIONS
 
@@ -283,7 +291,7 @@ async def edit_locations(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 
 async def specify_location(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    edited_travel = travel.Travel.get_user_travel(
+    edited_travel = await travel.Travel.get_user_travel(
         context.user_data["edited_travel_name"], update.effective_user.id
     )
     idx = update.message.text
@@ -293,7 +301,7 @@ async def specify_location(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         await update.message.reply_html("Sorry, index is invalid")
         return SPECIFY_LOCATION
 
-    travel.Travel.add_location(edited_travel.id, found_locations[int(idx) - 1].id)
+    await travel.Travel.add_location(edited_travel.id, found_locations[int(idx) - 1].id)
     await update.message.reply_html("Location added")
     return LOCATIONS
 
@@ -306,7 +314,7 @@ async def edit_start_date(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
 
 
 async def edit_end_date(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    edited_travel = travel.Travel.get_user_travel(
+    edited_travel = await travel.Travel.get_user_travel(
         context.user_data["edited_travel_name"], update.effective_user.id
     )
     travel_end_date = update.message.text
@@ -321,8 +329,8 @@ async def edit_end_date(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
         context.user_data["travel_start_date"], "%d.%m.%Y"
     )
     end_date = datetime.datetime.strptime(travel_end_date, "%d.%m.%Y")
-    travel.Travel.edit_value(edited_travel.id, "start_date", start_date)
-    travel.Travel.edit_value(edited_travel.id, "end_date", end_date)
+    await travel.Travel.edit_value(edited_travel.id, "start_date", start_date)
+    await travel.Travel.edit_value(edited_travel.id, "end_date", end_date)
 
     reply_keyboard = [
         [option]
@@ -344,7 +352,7 @@ async def edit_end_date(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
 
 
 async def invited(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    edited_travel = travel.Travel.get_user_travel(
+    edited_travel = await travel.Travel.get_user_travel(
         context.user_data["edited_travel_name"], update.effective_user.id
     )
     invited_user_name = update.message.text
@@ -367,14 +375,14 @@ async def invited(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         )
         return EDIT_COLUMN
 
-    invited_user = user.User.get_user_by_tg_username(invited_user_name)
+    invited_user = await user.User.get_user_by_tg_username(invited_user_name)
     if invited_user is None:
         await update.message.reply_html(
             "Sorry user is not found. Maybe user is not registered"
         )
         return INVITE
 
-    travel.Travel.invite_user(edited_travel.id, invited_user.id)
+    await travel.Travel.invite_user(edited_travel.id, invited_user.id)
     await update.message.reply_html("User invited")
     return INVITE
 
@@ -386,7 +394,7 @@ async def delete_chosen_travel(
     match user_input.lower():
         case "yes":
             travel_name = context.user_data["edited_travel_name"]
-            travel.Travel.delete_travel(travel_name, update.effective_user.id)
+            await travel.Travel.delete_travel(travel_name, update.effective_user.id)
             reply_keyboard = main_page_keyboard
             await update.message.reply_html(
                 "Travel deleted",
@@ -422,7 +430,9 @@ async def delete_chosen_travel(
 
 @sign_up_required
 async def leave_travel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    db_user = user.User.get_user_by_tg_id(update.effective_user.id)
+    db_user = await user.User.get_user_by_tg_id(
+        update.effective_user.id, load=("invited_travels",)
+    )
     invited_to = db_user.invited_travels
     if not invited_to:
         reply_keyboard = main_page_keyboard
@@ -448,10 +458,10 @@ async def leave_chosen_travel(
 ) -> int:
     user_input = update.message.text
     travel_name = user_input
-    user_travel = travel.Travel.get_user_and_invited_travel(
+    user_travel = await travel.Travel.get_user_and_invited_travel(
         travel_name, update.effective_user.id
     )
-    travel.Travel.remove_user(user_travel.id, update.effective_user.id)
+    await travel.Travel.remove_user(user_travel.id, update.effective_user.id)
     reply_keyboard = main_page_keyboard
     await update.message.reply_html(
         "Travel left",
@@ -1,4 +1,7 @@
+import asyncio
+
 from telegram import Update, ReplyKeyboardMarkup
+from telegram.error import BadRequest
 from telegram.ext import (
     CommandHandler,
     ContextTypes,
@@ -7,10 +10,10 @@ from telegram.ext import (
     MessageHandler,
 )
 
-from travel_bot.api import weather, route, hotels
+from travel_bot.api import weather, render, route, hotels
 from travel_bot.keyboards.common import main_page_keyboard
 from travel_bot.bot.validators import sign_up_required
-from travel_bot.db_models import user, travel
+from travel_bot.db_models import city, user, travel
 
 GET_INFO = 0
 
@@ -18,7 +21,9 @@ GET_INFO = 0
 @sign_up_required
 async def get_travels(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_user = update.effective_user
-    db_user = user.User.get_user_by_tg_id(tg_user.id)
+    db_user = await user.User.get_user_by_tg_id(
+        tg_user.id, load=("travels.locations", "invited_travels.locations")
+    )
 
     response = ""
     if db_user.travels:
@@ -53,7 +58,9 @@ async def get_travels(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 @sign_up_required
 async def choose_travel_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    db_user = user.User.get_user_by_tg_id(update.effective_user.id)
+    db_user = await user.User.get_user_by_tg_id(
+        update.effective_user.id, load=("travels", "invited_travels")
+    )
     available_travels = db_user.travels + db_user.invited_travels
 
     if not available_travels:
@@ -79,8 +86,10 @@ async def choose_travel_info(update: Update, context: ContextTypes.DEFAULT_TYPE)
 async def get_travel_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     travel_name = update.message.text
     tg_user = update.effective_user
-    db_user = user.User.get_user_by_tg_id(tg_user.id)
-    user_travel = travel.Travel.get_user_and_invited_travel(travel_name, tg_user.id)
+    db_user = await user.User.get_user_by_tg_id(tg_user.id, load=("city",))
+    user_travel = await travel.Travel.get_user_and_invited_travel(
+        travel_name, tg_user.id, load=("locations", "invited_users", "notes.by_user")
+    )
     if user_travel is None:
         await update.message.reply_html("Sorry, travel name is invalid")
         return GET_INFO
@@ -97,24 +106,101 @@ async def get_travel_info(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         response += "Invited users: \n"
         for invited_user in user_travel.invited_users:
             response += f"\t• {invited_user.tg_username}\n"
-    await update.message.reply_html(response)
 
-    cities = [db_user.city] + user_travel.locations
-    await update.message.reply_html("Travel route (might take a moment): \n")
-    img = route.get_map_png(*cities)
-    await update.message.reply_photo(
-        img, caption=f"{" - ".join(str(travel_city.name) for travel_city in cities)}"
+    cities = [db_user.city, *user_travel.locations]
+    route_message = asyncio.get_running_loop().create_future()
+
+    async def on_map_status(status: str) -> None:
+        message = await route_message
+        await message.edit_text(f"Travel route ({status}, might take a moment): ")
+
+    map_task = asyncio.create_task(
+        route.get_trip_map(*cities, on_status=on_map_status)
     )
+    hotels_task = asyncio.create_task(hotels.get_hotels_for_travel(user_travel))
+    weather_task = asyncio.create_task(weather.get_short_weather(user_travel))
 
-    notes = user_travel.notes
-    if notes:
-        await send_notes(update, notes)
+    try:
+        await update.message.reply_html(response)
 
-    await send_hotels(update, user_travel)
-    await send_weather(update, user_travel)
+        route_message.set_result(
+            await update.message.reply_html("Travel route (might take a moment): \n")
+        )
+        # A rejected file_id makes send_route_map render the map too
+        try:
+            img, legs = await map_task
+            if img is None:
+                await update.message.reply_html("Sorry, route is not available")
+            else:
+                await send_route_map(update, cities, img, legs)
+        except render.RenderQueueFull:
+            await update.message.reply_html(
+                "Sorry, too many maps are being drawn right now, try again later"
+            )
+
+        notes = user_travel.notes
+        if notes:
+            await send_notes(update, notes)
+
+        await send_hotels(update, await hotels_task)
+        await send_weather(update, await weather_task)
+    finally:
+        # Status updates wait for the route message, don't leave them hanging
+        # if replying failed. Sections not sent are cancelled and their
+        # errors retrieved
+        route_message.cancel()
+        await cancel_tasks(map_task, hotels_task, weather_task)
     return ConversationHandler.END
 
 
+async def cancel_tasks(*tasks: asyncio.Task) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def send_route_map(
+    update: Update, cities: list[city.City], img: str | bytes, legs: list[dict]
+) -> None:
+    caption = get_route_caption(cities, legs)
+    map_key = route.get_map_key(*cities)
+    try:
+        message = await update.message.reply_photo(img, caption=caption)
+    except BadRequest:
+        if not isinstance(img, str):
+            raise
+        # Stored file_id was rejected by Telegram, upload the image again
+        await route.save_map_file_id(map_key, None)
+        img = await route.get_map_png(*cities, legs=legs)
+        message = await update.message.reply_photo(img, caption=caption)
+
+    if message.photo and message.photo[-1].file_id != img:
+        await route.save_map_file_id(map_key, message.photo[-1].file_id)
+
+
+def get_route_caption(cities: list[city.City], legs: list[dict]) -> str:
+    caption = f"{" - ".join(str(travel_city.name) for travel_city in cities)}\n"
+    for from_city, to_city, leg in zip(cities, cities[1:], legs):
+        caption += (
+            f"\n{from_city.name} - {to_city.name}: "
+            f"{round(leg['distance'] / 1000)} km, {format_duration(leg['duration'])}"
+        )
+    total_distance = sum(leg["distance"] for leg in legs)
+    total_duration = sum(leg["duration"] for leg in legs)
+    caption += (
+        f"\n\nTotal: {round(total_distance / 1000)} km, "
+        f"{format_duration(total_duration)}"
+    )
+    return caption
+
+
+def format_duration(seconds: float) -> str:
+    hours, minutes = divmod(round(seconds / 60), 60)
+    if hours:
+        return f"{hours} h {minutes} min"
+    return f"{minutes} min"
+
+
 async def send_notes(update: Update, notes: list[travel.TravelNote]):
     notes_response = "Travel notes: "
     for travel_note in notes:
@@ -126,8 +212,7 @@ async def send_notes(update: Update, notes: list[travel.TravelNote]):
     await update.message.reply_html(notes_response)
 
 
-async def send_hotels(update: Update, user_travel: travel.Travel) -> None:
-    travel_hotels = hotels.get_hotels_for_travel(user_travel)
+async def send_hotels(update: Update, travel_hotels: dict) -> None:
     if travel_hotels["info"]["error_code"] != 0:
         await update.message.reply_html("Sorry, hotels data is not available")
         return
@@ -143,11 +228,12 @@ async def send_hotels(update: Update, user_travel: travel.Travel) -> None:
     await update.message.reply_html(hotels_response)
 
 
-async def send_weather(update: Update, user_travel: travel.Travel) -> None:
+async def send_weather(update: Update, weather_data: dict) -> None:
     reply_keyboard = main_page_keyboard
 
-    weather_data = weather.get_short_weather(user_travel)
     weather_response = "Travel weather: \n"
+    if weather_data["info"].get("source") == "climate":
+        weather_response = "Expected travel weather (based on climate normals): \n"
 
     if weather_data["info"]["error_code"] != 0:
         await update.message.reply_html(
@@ -165,6 +251,8 @@ async def send_weather(update: Update, user_travel: travel.Travel) -> None:
                 weather_response += (
                     f"• Rainy days: {', '.join(weather_data[loc]['rainy_days'])}\n"
                 )
+            if weather_data[loc].get("expected_rainy_days"):
+                weather_response += f"• Expected rainy days: {round(weather_data[loc]['expected_rainy_days'])}\n"
 
     await update.message.reply_html(
         weather_response,
@@ -0,0 +1,32 @@
+import logging
+import os
+
+from telegram.ext import ContextTypes
+
+from travel_bot.api import weather
+from travel_bot.db_models import travel
+
+logger = logging.getLogger(__name__)
+
+WEATHER_PREFETCH_INTERVAL = int(os.getenv("WEATHER_PREFETCH_INTERVAL", "10800"))
+
+
+async def prefetch_weather(context: ContextTypes.DEFAULT_TYPE) -> None:
+    upcoming_travels = await travel.Travel.get_upcoming_travels(
+        weather.FORECAST_DAYS, load=("locations",)
+    )
+    if not upcoming_travels:
+        return
+
+    locations_count = len(
+        {
+            weather.snap_to_grid(loc.latitude, loc.longitude)
+            for user_travel in upcoming_travels
+            for loc in user_travel.locations
+        }
+    )
+    await weather.get_weather_for_travels(upcoming_travels)
+    logger.info(
+        f"Prefetched weather for {len(upcoming_travels)} travels "
+        f"({locations_count} locations)"
+    )
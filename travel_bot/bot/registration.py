@@ -16,7 +16,7 @@ CITY, SPECIFY_CITY, COUNTRY, AGE, BIO, CREATE_USER = range(6)
 
 async def sign_up(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     tg_user = update.effective_user
-    if user.User.get_user(tg_user.id):
+    if await user.User.get_user(tg_user.id):
         reply_keyboard = main_page_keyboard
         await update.message.reply_html(
             rf"Hi {tg_user.mention_html()}! You are already registered!",
@@ -32,7 +32,7 @@ async def sign_up(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
 async def get_city(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_city = update.message.text
-    is_valid, hints = validate_city(user_city)
+    is_valid, hints = await validate_city(user_city)
 
     if not is_valid:
         response = "Sorry, location is invalid\n"
@@ -43,7 +43,7 @@ async def get_city(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         await update.message.reply_html(response)
         return CITY
 
-    found_locations = city.City.get_cities_by_name(user_city)
+    found_locations = await city.City.get_cities_by_name(user_city, load=("country",))
     if len(found_locations) == 1:
         context.user_data["city_name"] = found_locations[0].name
         context.user_data["city_id"] = found_locations[0].id
@@ -80,11 +80,11 @@ async def specify_location(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 
 async def get_country(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     user_country = update.message.text
-    if not validate_country(user_country):
+    if not await validate_country(user_country):
         await update.message.reply_html("Sorry, country is invalid")
         return COUNTRY
 
-    user_country = country.Country.get_country_by_name(user_country)
+    user_country = await country.Country.get_country_by_name(user_country)
     context.user_data["country_id"] = user_country.id
     context.user_data["country_name"] = user_country.name
     await update.message.reply_html(rf"Got your city: {user_country.name}")
@@ -121,7 +121,7 @@ async def skip_bio(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
 async def create_user(update: Update, context: ContextTypes.DEFAULT_TYPE):
     tg_user = update.effective_user
-    user.User.create_user(
+    await user.User.create_user(
         tg_user.id,
         tg_user.username,
         context.user_data["city_id"],
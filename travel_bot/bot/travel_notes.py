@@ -16,7 +16,9 @@ CHOOSE_TRAVEL, CHOOSE_ACTION, CHOOSE_IS_PUBLIC, ADD_NOTE, REMOVE_NOTE = range(5)
 
 @sign_up_required
 async def edit_notes(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    db_user = user.User.get_user_by_tg_id(update.effective_user.id)
+    db_user = await user.User.get_user_by_tg_id(
+        update.effective_user.id, load=("travels", "invited_travels")
+    )
     available_travels = db_user.travels + db_user.invited_travels
 
     if not available_travels:
@@ -43,7 +45,9 @@ async def choose_travel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     travel_name = update.message.text
     context.user_data["travel_name"] = travel_name
     tg_user = update.effective_user
-    user_travel = travel.Travel.get_user_and_invited_travel(travel_name, tg_user.id)
+    user_travel = await travel.Travel.get_user_and_invited_travel(
+        travel_name, tg_user.id, load=("notes.by_user",)
+    )
     if user_travel is None:
         await update.message.reply_html("Sorry, travel name is invalid")
         return CHOOSE_TRAVEL
@@ -75,8 +79,8 @@ async def choose_travel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
 
 
 async def choose_action(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    user_travel = travel.Travel.get_user_and_invited_travel(
-        context.user_data["travel_name"], update.effective_user.id
+    user_travel = await travel.Travel.get_user_and_invited_travel(
+        context.user_data["travel_name"], update.effective_user.id, load=("notes",)
     )
     travel_notes = user_travel.notes
     action = update.message.text
@@ -133,11 +137,11 @@ async def choose_is_public(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 
 
 async def add_note(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    user_travel = travel.Travel.get_user_and_invited_travel(
+    user_travel = await travel.Travel.get_user_and_invited_travel(
         context.user_data["travel_name"], update.effective_user.id
     )
     note = update.message.text
-    travel.TravelNote.add_note(
+    await travel.TravelNote.add_note(
         user_travel.id, update.effective_user.id, note, context.user_data["is_public"]
     )
     reply_keyboard = [["add"], ["remove"], ["end"]]
@@ -149,8 +153,8 @@ async def add_note(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
 
 
 async def remove_note(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    user_travel = travel.Travel.get_user_and_invited_travel(
-        context.user_data["travel_name"], update.effective_user.id
+    user_travel = await travel.Travel.get_user_and_invited_travel(
+        context.user_data["travel_name"], update.effective_user.id, load=("notes",)
     )
     travel_notes = user_travel.notes
     travel_notes = list(
@@ -172,7 +176,7 @@ async def remove_note(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
         )
         return REMOVE_NOTE
 
-    travel.TravelNote.delete_note(note_to_del.id)
+    await travel.TravelNote.delete_note(note_to_del.id)
     await update.message.reply_html(
         "Note removed. You can add new one using 'add', remove one using 'remove' or finish editing using 'end'"
     )
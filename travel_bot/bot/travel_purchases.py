@@ -19,7 +19,9 @@ CHOOSE_TRAVEL, CHOOSE_ACTION, PURCHASE_SUM, ADD_PURCHASE, SEE_PURCHASES = range(
 
 @sign_up_required
 async def edit_purchases(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    db_user = user.User.get_user_by_tg_id(update.effective_user.id)
+    db_user = await user.User.get_user_by_tg_id(
+        update.effective_user.id, load=("travels", "invited_travels")
+    )
     available_travels = db_user.travels + db_user.invited_travels
 
     if not available_travels:
@@ -46,7 +48,9 @@ async def choose_travel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
     travel_name = update.message.text
     context.user_data["travel_name"] = travel_name
     tg_user = update.effective_user
-    user_travel = travel.Travel.get_user_and_invited_travel(travel_name, tg_user.id)
+    user_travel = await travel.Travel.get_user_and_invited_travel(
+        travel_name, tg_user.id
+    )
     if user_travel is None:
         await update.message.reply_html("Sorry, travel name is invalid")
         return CHOOSE_TRAVEL
@@ -85,12 +89,12 @@ async def get_purchase_sum(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 
 
 async def add_purchase(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    user_travel = travel.Travel.get_user_and_invited_travel(
+    user_travel = await travel.Travel.get_user_and_invited_travel(
         context.user_data["travel_name"], update.effective_user.id
     )
     purchase = context.user_data["purchase"]
     note = update.message.text
-    travel.TravelPurchase.add_purchase(
+    await travel.TravelPurchase.add_purchase(
         user_travel.id, update.effective_user.id, purchase, note
     )
     reply_keyboard = [["add"], ["see"], ["end"]]
@@ -99,8 +103,10 @@ async def add_purchase(update: Update, context: ContextTypes.DEFAULT_TYPE) -> in
 
 
 async def see_purchases(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
-    user_travel = travel.Travel.get_user_and_invited_travel(
-        context.user_data["travel_name"], update.effective_user.id
+    user_travel = await travel.Travel.get_user_and_invited_travel(
+        context.user_data["travel_name"],
+        update.effective_user.id,
+        load=("owner", "invited_users", "purchases"),
     )
     if not user_travel.purchases:
         reply_keyboard = [["add"], ["see"], ["end"]]
@@ -109,13 +115,13 @@ async def see_purchases(update: Update, context: ContextTypes.DEFAULT_TYPE) -> i
 
     response = "Travel purchases: \n"
     for person in [user_travel.owner] + user_travel.invited_users:
-        person_purchases = travel.TravelPurchase.get_user_purchases(person.id)
+        person_purchases = await travel.TravelPurchase.get_user_purchases(person.id)
         if not person_purchases:
             continue
         response += f"\n{person.tg_username} purchases: \n"
         for idx, purchase in enumerate(person_purchases, start=1):
             response += f"{idx}. {purchase.price} ({purchase.note}) on {datetime.date.strftime(purchase.on_date, '%d-%m-%Y')}\n"
-        response += f"{person.tg_username} total: {travel.TravelPurchase.get_user_total_price(person.id)} \n"
+        response += f"{person.tg_username} total: {await travel.TravelPurchase.get_user_total_price(person.id)} \n"
 
     reply_keyboard = [["add"], ["see"], ["end"]]
     await update.message.reply_html(response, reply_markup=ReplyKeyboardMarkup(reply_keyboard, one_time_keyboard=True))
@@ -10,7 +10,7 @@ from travel_bot.db_models import country, user, travel, city
 def sign_up_required(func):
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         tg_user = update.message.from_user
-        if user.User.get_user(tg_user.id):
+        if await user.User.get_user(tg_user.id):
             return await func(update, context)
         else:
             await update.message.reply_html("Please /sign_up first")
@@ -22,7 +22,7 @@ def sign_up_required(func):
 def must_have_travels(func):
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
         tg_user = update.effective_user
-        if travel.Travel.get_user_travels(tg_user.id):
+        if await travel.Travel.get_user_travels(tg_user.id):
             return await func(update, context)
         else:
             reply_keyboard = main_page_keyboard
@@ -38,17 +38,17 @@ def must_have_travels(func):
     return wrapper
 
 
-def validate_city(city_name: str) -> (bool, list[city.City]):
-    found_cities = city.City.get_cities_by_name(city_name)
+async def validate_city(city_name: str) -> (bool, list[city.City]):
+    found_cities = await city.City.get_cities_by_name(city_name)
     if len(found_cities) != 0:
         return True, []
 
-    hints = city.City.get_similar_cities(city_name)[:20]
+    hints = await city.City.get_similar_cities(city_name, load=("country",))
     return False, hints
 
 
-def validate_country(country_name: str) -> bool:
-    return country.Country.get_country_by_name(country_name) is not None
+async def validate_country(country_name: str) -> bool:
+    return await country.Country.get_country_by_name(country_name) is not None
 
 
 def validate_age(age: str) -> bool:
@@ -59,8 +59,8 @@ def validate_age(age: str) -> bool:
     return True
 
 
-def validate_travel_name(name: str, user_id: int) -> bool:
-    travels = travel.Travel.get_user_travel(name, user_id)
+async def validate_travel_name(name: str, user_id: int) -> bool:
+    travels = await travel.Travel.get_user_travel(name, user_id)
     return travels is None
 
 
@@ -68,8 +68,8 @@ def validate_travel_description(description: str) -> bool:
     return bool(description.strip())
 
 
-def validate_travel_locations(locations: list[str]) -> bool:
-    return all([validate_city(location) for location in locations])
+async def validate_travel_locations(locations: list[str]) -> bool:
+    return all([await validate_city(location) for location in locations])
 
 
 def validate_travel_dates(start_date: str, end_date: str) -> bool:
@@ -83,8 +83,8 @@ def validate_travel_dates(start_date: str, end_date: str) -> bool:
     return True
 
 
-def validate_username(username: str) -> bool:
-    return user.User.get_user_by_tg_username(username) is not None
+async def validate_username(username: str) -> bool:
+    return await user.User.get_user_by_tg_username(username) is not None
 
 
 def validate_purchase(price: str) -> bool:
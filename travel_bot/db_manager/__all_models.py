@@ -1 +1 @@
-from travel_bot.db_models import city, country, travel, user  # noqa
+from travel_bot.db_models import city, country, hotel_region, travel, user  # noqa
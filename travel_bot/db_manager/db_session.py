@@ -1,7 +1,13 @@
+import contextlib
+import contextvars
 import logging
 import os
+import sys
+from typing import AsyncIterator, Iterator
 
 import sqlalchemy as sa
+from sqlalchemy.ext.associationproxy import AssociationProxyInstance
+from sqlalchemy.ext.asyncio import async_sessionmaker, AsyncSession, create_async_engine
 import sqlalchemy.ext.declarative as dec
 import sqlalchemy.orm as orm
 from sqlalchemy.orm import Session
@@ -9,27 +15,153 @@ from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "3600"))
+# Record where every session is opened, so leak warnings point at the caller
+DB_TRACK_ORIGIN = os.getenv("DB_TRACK_ORIGIN", "1") == "1"
+
 SqlAlchemyBase = dec.declarative_base()
-__factory = None
+__async_factory = None
+__async_engine = None
+
+# Sessions opened during the current update, see track_sessions
+tracked_sessions = contextvars.ContextVar("tracked_sessions", default=None)
+
+
+def get_origin() -> str | None:
+    # Walks frames without reading source lines, it runs for every session.
+    # Scopes are contextlib managers, their frames are skipped too
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename not in (__file__, contextlib.__file__) and (
+            f"{os.sep}sqlalchemy{os.sep}" not in filename
+        ):
+            return f"{filename}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class TrackedSession(Session):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.origin = None
+        self.tracked_in = tracked_sessions.get()
+        if self.tracked_in is not None:
+            if DB_TRACK_ORIGIN:
+                self.origin = get_origin()
+            self.tracked_in.add(self)
+
+    def close(self) -> None:
+        super().close()
+        if self.tracked_in is not None:
+            self.tracked_in.discard(self)
+
+
+def get_async_url(conn_str: str) -> sa.URL:
+    url = sa.make_url(conn_str)
+    if url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url
+
+
+def get_pool_options() -> dict:
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
 
 
 def global_init():
-    global __factory
+    global __async_factory, __async_engine
 
-    if __factory:
+    if __async_factory:
         return
 
     conn_str = os.getenv("DB_URL")
     logger.info(f"Connecting to db: {conn_str}")
 
+    # The sync engine only creates and migrates the schema, the bot itself
+    # queries through the async engine without blocking the loop
     engine = sa.create_engine(conn_str, echo=False)
-    __factory = orm.sessionmaker(bind=engine)
+    __async_engine = create_async_engine(
+        get_async_url(conn_str),
+        echo=False,
+        poolclass=sa.pool.AsyncAdaptedQueuePool,
+        **get_pool_options(),
+    )
+    # Objects stay usable after their session is closed
+    __async_factory = async_sessionmaker(
+        bind=__async_engine, sync_session_class=TrackedSession, expire_on_commit=False
+    )
 
     from . import __all_models  # noqa
+    from . import migrations
 
     SqlAlchemyBase.metadata.create_all(engine)
+    migrations.upgrade(engine)
+    engine.dispose()
+
+
+def create_async_session() -> AsyncSession:
+    return __async_factory()
+
+
+@contextlib.asynccontextmanager
+async def async_session_scope() -> AsyncIterator[AsyncSession]:
+    db_sess = create_async_session()
+    try:
+        yield db_sess
+    except Exception:
+        await db_sess.rollback()
+        raise
+    finally:
+        await db_sess.close()
+
+
+async def close_engine() -> None:
+    if __async_engine is not None:
+        await __async_engine.dispose()
+
+
+def get_load_options(model, load: tuple[str, ...]) -> list:
+    # Relationships don't load by default, callers name the dotted paths they use.
+    # Collections are loaded with one extra SELECT IN, single objects joined
+    options = []
+    for path in load:
+        option, entity = None, model
+        names = path.split(".")
+        while names:
+            attribute = getattr(entity, names.pop(0))
+            if isinstance(attribute, AssociationProxyInstance):
+                # Load the association objects together with their targets
+                names[:0] = [attribute.target_collection, attribute.value_attr]
+                continue
+            loader = "selectinload" if attribute.property.uselist else "joinedload"
+            if option is None:
+                option = getattr(orm, loader)(attribute)
+            else:
+                option = getattr(option, loader)(attribute)
+            entity = attribute.property.mapper.class_
+        options.append(option)
+    return options
 
 
-def create_session() -> Session:
-    global __factory
-    return __factory()
+@contextlib.contextmanager
+def track_sessions(scope_name: str) -> Iterator[set]:
+    sessions = set()
+    token = tracked_sessions.set(sessions)
+    try:
+        yield sessions
+    finally:
+        tracked_sessions.reset(token)
+        for db_sess in sessions:
+            logger.warning(
+                f"Session opened at {db_sess.origin} is still open "
+                f"at the end of {scope_name}"
+            )
@@ -0,0 +1,93 @@
+import logging
+import sqlite3
+
+import sqlalchemy as sa
+
+logger = logging.getLogger(__name__)
+
+# Schema changes for databases created before the models changed. create_all only
+# adds missing tables, so existing travels.db files are upgraded here. Migration n
+# is MIGRATIONS[n - 1], the number of applied ones is kept in PRAGMA user_version.
+# Scripts run after create_all and must also work on a freshly created schema.
+MIGRATIONS = [
+    # 1: primary key on travel_to_user (repeated invites are dropped), own key
+    # for every travel_to_city row (repeated stops are kept), indexes on foreign
+    # keys used by travels, notes and purchases lookups
+    """
+    CREATE TABLE travel_to_user_new (
+        travel_id INTEGER NOT NULL REFERENCES travels (id),
+        user_id INTEGER NOT NULL REFERENCES users (id),
+        PRIMARY KEY (travel_id, user_id)
+    );
+    INSERT OR IGNORE INTO travel_to_user_new (travel_id, user_id)
+        SELECT travel_id, user_id FROM travel_to_user
+        WHERE travel_id IS NOT NULL AND user_id IS NOT NULL;
+    DROP TABLE travel_to_user;
+    ALTER TABLE travel_to_user_new RENAME TO travel_to_user;
+    CREATE INDEX ix_travel_to_user_user_id ON travel_to_user (user_id);
+
+    CREATE TABLE travel_to_city_new (
+        id INTEGER NOT NULL PRIMARY KEY,
+        travel_id INTEGER REFERENCES travels (id),
+        city_id INTEGER REFERENCES cities (id)
+    );
+    INSERT INTO travel_to_city_new (id, travel_id, city_id)
+        SELECT rowid, travel_id, city_id FROM travel_to_city ORDER BY rowid;
+    DROP TABLE travel_to_city;
+    ALTER TABLE travel_to_city_new RENAME TO travel_to_city;
+    CREATE INDEX ix_travel_to_city_travel_id ON travel_to_city (travel_id);
+    CREATE INDEX ix_travel_to_city_city_id ON travel_to_city (city_id);
+
+    CREATE INDEX IF NOT EXISTS ix_travels_owner_id ON travels (owner_id);
+    CREATE INDEX IF NOT EXISTS ix_travel_notes_travel_id ON travel_notes (travel_id);
+    CREATE INDEX IF NOT EXISTS ix_purchases_travel_id ON purchases (travel_id);
+    CREATE INDEX IF NOT EXISTS ix_purchases_user_id ON purchases (user_id);
+    """,
+    # 2: trigram full-text index over city names for similar cities search,
+    # kept in sync with the cities table by triggers
+    """
+    CREATE VIRTUAL TABLE cities_fts USING fts5(
+        name, content='cities', content_rowid='id', tokenize='trigram'
+    );
+    CREATE TRIGGER cities_fts_insert AFTER INSERT ON cities BEGIN
+        INSERT INTO cities_fts (rowid, name) VALUES (new.id, new.name);
+    END;
+    CREATE TRIGGER cities_fts_delete AFTER DELETE ON cities BEGIN
+        INSERT INTO cities_fts (cities_fts, rowid, name)
+            VALUES ('delete', old.id, old.name);
+    END;
+    CREATE TRIGGER cities_fts_update AFTER UPDATE OF name ON cities BEGIN
+        INSERT INTO cities_fts (cities_fts, rowid, name)
+            VALUES ('delete', old.id, old.name);
+        INSERT INTO cities_fts (rowid, name) VALUES (new.id, new.name);
+    END;
+    INSERT INTO cities_fts (cities_fts) VALUES ('rebuild');
+    """,
+]
+
+
+def get_version(db_conn: sqlite3.Connection) -> int:
+    return db_conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def upgrade(engine: sa.Engine) -> None:
+    if engine.dialect.name != "sqlite":
+        logger.warning(f"Migrations are not supported for {engine.dialect.name}")
+        return
+
+    with engine.connect() as conn:
+        db_conn = conn.connection.driver_connection
+        version = get_version(db_conn)
+        for number, script in enumerate(MIGRATIONS[version:], start=version + 1):
+            # executescript doesn't open transactions itself, each migration is
+            # applied together with its version number or not at all
+            try:
+                db_conn.executescript(
+                    f"BEGIN;\n{script}\nPRAGMA user_version = {number};\nCOMMIT;"
+                )
+            except sqlite3.Error:
+                if db_conn.in_transaction:
+                    db_conn.execute("ROLLBACK")
+                logger.exception(f"Migration {number} failed")
+                raise
+            logger.info(f"Database migrated to version {number}")
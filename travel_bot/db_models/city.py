@@ -1,10 +1,32 @@
 from typing import Union, Type
 
 import sqlalchemy
-from sqlalchemy.orm import Session
 
 from travel_bot.db_manager import db_session
 
+CITY_HINTS_LIMIT = 20
+# Trigram index can't match shorter queries
+TRIGRAM_LENGTH = 3
+
+# Created by migrations, not part of the models metadata
+cities_fts = sqlalchemy.table(
+    "cities_fts",
+    sqlalchemy.column("rowid"),
+    sqlalchemy.column("name"),
+    sqlalchemy.column("rank"),
+)
+
+
+def get_match_query(city_name: str, any_trigram: bool = False) -> str:
+    # Quoted strings are taken literally by FTS5 instead of as query syntax
+    if not any_trigram:
+        return '"' + city_name.replace('"', '""') + '"'
+    trigrams = {
+        city_name[i : i + TRIGRAM_LENGTH]
+        for i in range(len(city_name) - TRIGRAM_LENGTH + 1)
+    }
+    return " OR ".join(get_match_query(trigram) for trigram in sorted(trigrams))
+
 
 class City(db_session.SqlAlchemyBase):
     __tablename__ = "cities"
@@ -25,16 +47,69 @@ class City(db_session.SqlAlchemyBase):
     longitude = sqlalchemy.Column(sqlalchemy.Float(precision=8), nullable=False)
 
     country = sqlalchemy.orm.relationship(
-        "Country", back_populates="cities", lazy="subquery"
+        "Country", back_populates="cities", lazy="raise"
     )
 
     @staticmethod
-    def get_cities_by_name(city_name: str) -> Union[tuple["City"], None]:
-        db_sess = db_session.create_session()
-        # noinspection PyTypeChecker
-        return db_sess.query(City).filter(City.name == city_name).all()
+    async def get_cities_by_name(
+        city_name: str, load: tuple[str, ...] = ()
+    ) -> Union[tuple["City"], None]:
+        async with db_session.async_session_scope() as db_sess:
+            # noinspection PyTypeChecker
+            return (
+                await db_sess.scalars(
+                    sqlalchemy.select(City)
+                    .options(*db_session.get_load_options(City, load))
+                    .where(City.name == city_name)
+                )
+            ).all()
+
+    @staticmethod
+    async def get_similar_cities(
+        city_name: str, load: tuple[str, ...] = (), limit: int = CITY_HINTS_LIMIT
+    ) -> list[Type["City"]]:
+        async with db_session.async_session_scope() as db_sess:
+            query = sqlalchemy.select(City).options(
+                *db_session.get_load_options(City, load)
+            )
+            if len(city_name) < TRIGRAM_LENGTH:
+                return (
+                    await db_sess.scalars(
+                        query.where(City.name.like(f"%{city_name}%")).limit(limit)
+                    )
+                ).all()
+
+            # Cities containing the name first, then ones sharing most of its
+            # trigrams, so mistyped names still get hints. rank is bm25
+            query = query.join(cities_fts, cities_fts.c.rowid == City.id).order_by(
+                cities_fts.c.rank
+            )
+            for any_trigram in (False, True):
+                cities = (
+                    await db_sess.scalars(
+                        query.where(
+                            cities_fts.c.name.match(
+                                get_match_query(city_name, any_trigram)
+                            )
+                        ).limit(limit)
+                    )
+                ).all()
+                if cities:
+                    return cities
+            return []
 
     @staticmethod
-    def get_similar_cities(city_name: str) -> list[Type["City"]]:
-        db_sess = db_session.create_session()
-        return db_sess.query(City).filter(City.name.like(f"%{city_name}%")).all()
+    async def get_coordinates(used_only: bool = False) -> list[tuple[float, float]]:
+        async with db_session.async_session_scope() as db_sess:
+            query = sqlalchemy.select(City.latitude, City.longitude)
+            if used_only:
+                tables = db_session.SqlAlchemyBase.metadata.tables
+                query = query.where(
+                    sqlalchemy.or_(
+                        City.id.in_(sqlalchemy.select(tables["users"].c.city_id)),
+                        City.id.in_(
+                            sqlalchemy.select(tables["travel_to_city"].c.city_id)
+                        ),
+                    )
+                )
+            return [(lat, lon) for lat, lon in await db_sess.execute(query)]
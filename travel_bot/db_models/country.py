@@ -35,11 +35,13 @@ class Country(db_session.SqlAlchemyBase):
     emojiU = sqlalchemy.Column(sqlalchemy.String(191))  # noqa: N815
 
     cities = sqlalchemy.orm.relationship(
-        "City", back_populates="country", lazy="subquery"
+        "City", back_populates="country", lazy="raise"
     )
 
     @staticmethod
-    def get_country_by_name(country_name: str) -> Union["Country", None]:
-        db_sess = db_session.create_session()
-        # noinspection PyTypeChecker
-        return db_sess.query(Country).filter(Country.name == country_name).first()
+    async def get_country_by_name(country_name: str) -> Union["Country", None]:
+        async with db_session.async_session_scope() as db_sess:
+            # noinspection PyTypeChecker
+            return await db_sess.scalar(
+                sqlalchemy.select(Country).where(Country.name == country_name)
+            )
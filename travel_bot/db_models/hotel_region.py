@@ -0,0 +1,51 @@
+import datetime
+import logging
+from typing import Union
+
+import sqlalchemy
+from sqlalchemy.dialects import sqlite
+
+from travel_bot.db_manager import db_session
+
+
+logger = logging.getLogger(__name__)
+
+
+class HotelRegion(db_session.SqlAlchemyBase):
+    __tablename__ = "hotel_regions"
+
+    city_id = sqlalchemy.Column(
+        sqlalchemy.Integer, sqlalchemy.ForeignKey("cities.id"), primary_key=True
+    )
+    region_id = sqlalchemy.Column(sqlalchemy.String, nullable=False)
+
+    updated = sqlalchemy.Column(
+        sqlalchemy.DateTime, default=datetime.datetime.now, nullable=False
+    )
+
+    @staticmethod
+    async def get_region_id(city_id: int) -> Union[str, None]:
+        async with db_session.async_session_scope() as db_sess:
+            hotel_region = await db_sess.get(HotelRegion, city_id)
+            if hotel_region is None:
+                return None
+            return hotel_region.region_id
+
+    @staticmethod
+    async def save_region_id(city_id: int, region_id: str) -> None:
+        async with db_session.async_session_scope() as db_sess:
+            # Upsert, concurrent first lookups of one city may both save it
+            insert = sqlite.insert(HotelRegion).values(
+                city_id=city_id, region_id=region_id, updated=datetime.datetime.now()
+            )
+            await db_sess.execute(
+                insert.on_conflict_do_update(
+                    index_elements=[HotelRegion.city_id],
+                    set_={
+                        "region_id": insert.excluded.region_id,
+                        "updated": insert.excluded.updated,
+                    },
+                )
+            )
+            await db_sess.commit()
+            logger.info(f"Hotels region {region_id} saved for city with id: {city_id}")
@@ -3,9 +3,10 @@ import logging
 from typing import Union
 
 import sqlalchemy
+from sqlalchemy.ext.associationproxy import association_proxy
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from travel_bot.db_manager import db_session
-from travel_bot.db_models.city import City
 from travel_bot.db_models.user import User
 
 
@@ -18,7 +19,10 @@ class Travel(db_session.SqlAlchemyBase):
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
     owner_id = sqlalchemy.Column(
-        sqlalchemy.Integer, sqlalchemy.ForeignKey("users.id"), nullable=False
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey("users.id"),
+        nullable=False,
+        index=True,
     )
     name = sqlalchemy.Column(sqlalchemy.String, nullable=False, index=True)
 
@@ -27,147 +31,196 @@ class Travel(db_session.SqlAlchemyBase):
     start_date = sqlalchemy.Column(sqlalchemy.Date, nullable=False)
     end_date = sqlalchemy.Column(sqlalchemy.Date, nullable=False)
 
-    owner = sqlalchemy.orm.relationship("User", lazy="subquery")
+    owner = sqlalchemy.orm.relationship("User", lazy="raise")
     notes = sqlalchemy.orm.relationship(
-        "TravelNote", back_populates="travel", lazy="subquery", cascade="all, delete"
+        "TravelNote", back_populates="travel", lazy="raise", cascade="all, delete"
     )
     purchases = sqlalchemy.orm.relationship(
-        "TravelPurchase", back_populates="travel", lazy="subquery", cascade="all, delete"
+        "TravelPurchase", back_populates="travel", lazy="raise", cascade="all, delete"
+    )
+    # Stops in travel order, the same city may appear more than once
+    stops = sqlalchemy.orm.relationship(
+        "TravelLocation",
+        order_by="TravelLocation.id",
+        lazy="raise",
+        cascade="all, delete-orphan",
     )
-    locations = sqlalchemy.orm.relationship(
-        "City", secondary="travel_to_city", lazy="subquery", backref="travels"
+    locations = association_proxy(
+        "stops", "city", creator=lambda city: TravelLocation(city=city)
     )
     invited_users = sqlalchemy.orm.relationship(
         "User",
         secondary="travel_to_user",
-        lazy="subquery",
+        lazy="raise",
         back_populates="invited_travels",
     )
 
     @staticmethod
-    def create_travel(
+    async def create_travel(
         owner_id: int,
         name: str,
         description: str,
         start_date: datetime.datetime,
         end_date: datetime.datetime,
     ) -> "Travel":
-        db_sess = db_session.create_session()
-        travel = Travel(
-            owner_id=owner_id,
-            name=name,
-            description=description,
-            start_date=start_date,
-            end_date=end_date,
-        )
-        db_sess.add(travel)
-        db_sess.commit()
-        logger.info(f"Travel with id: {travel.id} created")
-        return travel
+        async with db_session.async_session_scope() as db_sess:
+            travel = Travel(
+                owner_id=owner_id,
+                name=name,
+                description=description,
+                start_date=start_date,
+                end_date=end_date,
+            )
+            db_sess.add(travel)
+            await db_sess.commit()
+            logger.info(f"Travel with id: {travel.id} created")
+            return travel
 
     @staticmethod
-    def get_user_travel(travel_name: str, user_id: int) -> Union["Travel", None]:
-        db_sess = db_session.create_session()
-        travel = (
-            db_sess.query(Travel)
-            .filter(Travel.name == travel_name, Travel.owner_id == user_id)
-            .first()
+    async def get_travel(
+        db_sess: "AsyncSession", travel_id: int, load: tuple[str, ...] = ()
+    ) -> Union["Travel", None]:
+        return await db_sess.scalar(
+            sqlalchemy.select(Travel)
+            .options(*db_session.get_load_options(Travel, load))
+            .where(Travel.id == travel_id)
         )
-        return travel
 
     @staticmethod
-    def get_user_and_invited_travel(
-        travel_name: str, user_id: int
+    async def get_user_travel(
+        travel_name: str, user_id: int, load: tuple[str, ...] = ()
     ) -> Union["Travel", None]:
-        db_sess = db_session.create_session()
-        user = db_sess.query(User).filter(User.id == user_id).first()
-        travel = db_sess.query(Travel).filter(Travel.name == travel_name).first()
-        if travel is None:
-            return None
-        if travel.owner == user or user in travel.invited_users:
+        async with db_session.async_session_scope() as db_sess:
+            travel = await db_sess.scalar(
+                sqlalchemy.select(Travel)
+                .options(*db_session.get_load_options(Travel, load))
+                .where(Travel.name == travel_name, Travel.owner_id == user_id)
+            )
             return travel
-        return None
 
     @staticmethod
-    def get_user_travels(user_id: int) -> list["Travel"]:
-        db_sess = db_session.create_session()
-        travels = db_sess.query(Travel).filter(Travel.owner_id == user_id).all()
-        return travels
+    async def get_user_and_invited_travel(
+        travel_name: str, user_id: int, load: tuple[str, ...] = ()
+    ) -> Union["Travel", None]:
+        async with db_session.async_session_scope() as db_sess:
+            travel = await db_sess.scalar(
+                sqlalchemy.select(Travel)
+                .options(*db_session.get_load_options(Travel, load))
+                .where(
+                    Travel.name == travel_name,
+                    sqlalchemy.or_(
+                        Travel.owner_id == user_id,
+                        Travel.invited_users.any(User.id == user_id),
+                    ),
+                )
+            )
+            return travel
 
     @staticmethod
-    def delete_travel(travel_name: str, user_id: int) -> None:
-        db_sess = db_session.create_session()
-        travel_to_del = (
-            db_sess.query(Travel)
-            .filter(Travel.name == travel_name, Travel.owner_id == user_id)
-            .first()
-        )
-        db_sess.delete(travel_to_del)
-        db_sess.commit()
-        logger.info(f"Travel with id: {travel_to_del.id} deleted")
+    async def get_user_travels(user_id: int) -> list["Travel"]:
+        async with db_session.async_session_scope() as db_sess:
+            travels = (
+                await db_sess.scalars(
+                    sqlalchemy.select(Travel).where(Travel.owner_id == user_id)
+                )
+            ).all()
+            return travels
 
     @staticmethod
-    def invite_user(travel_id: int, user_id: int) -> None:
-        db_sess = db_session.create_session()
+    async def get_upcoming_travels(
+        days: int, load: tuple[str, ...] = ()
+    ) -> list["Travel"]:
+        async with db_session.async_session_scope() as db_sess:
+            today = datetime.date.today()
+            travels = (
+                await db_sess.scalars(
+                    sqlalchemy.select(Travel)
+                    .options(*db_session.get_load_options(Travel, load))
+                    .where(
+                        Travel.start_date <= today + datetime.timedelta(days=days),
+                        Travel.end_date >= today,
+                    )
+                )
+            ).all()
+            return travels
 
-        travel = db_sess.query(Travel).filter(Travel.id == travel_id).first()
-        user = db_sess.query(User).filter(User.id == user_id).first()
-        travel.invited_users.append(user)
+    @staticmethod
+    async def delete_travel(travel_name: str, user_id: int) -> None:
+        async with db_session.async_session_scope() as db_sess:
+            # Notes, purchases and association rows are deleted along with the travel
+            travel_to_del = await db_sess.scalar(
+                sqlalchemy.select(Travel)
+                .options(
+                    *db_session.get_load_options(
+                        Travel, ("notes", "purchases", "stops", "invited_users")
+                    )
+                )
+                .where(Travel.name == travel_name, Travel.owner_id == user_id)
+            )
+            await db_sess.delete(travel_to_del)
+            await db_sess.commit()
+            logger.info(f"Travel with id: {travel_to_del.id} deleted")
 
-        db_sess.commit()
+    @staticmethod
+    async def invite_user(travel_id: int, user_id: int) -> None:
+        async with db_session.async_session_scope() as db_sess:
+            travel = await Travel.get_travel(db_sess, travel_id, ("invited_users",))
+            user = await db_sess.get(User, user_id)
+            if user not in travel.invited_users:
+                travel.invited_users.append(user)
+
+            await db_sess.commit()
         logger.info(f"User with id: {user_id} invited to travel with id: {travel_id}")
 
     @staticmethod
-    def remove_user(travel_id: int, user_id: int) -> None:
-        db_sess = db_session.create_session()
-        travel = db_sess.query(Travel).filter(Travel.id == travel_id).first()
-        user = db_sess.query(User).filter(User.id == user_id).first()
-        travel.invited_users.remove(user)
-        db_sess.commit()
+    async def remove_user(travel_id: int, user_id: int) -> None:
+        async with db_session.async_session_scope() as db_sess:
+            travel = await Travel.get_travel(db_sess, travel_id, ("invited_users",))
+            user = await db_sess.get(User, user_id)
+            travel.invited_users.remove(user)
+            await db_sess.commit()
         logger.info(f"User with id: {user_id} removed from travel with id: {travel_id}")
 
     @staticmethod
-    def remove_users(travel_id: int) -> None:
-        db_sess = db_session.create_session()
-        travel = db_sess.query(Travel).filter(Travel.id == travel_id).first()
-        travel.invited_users.clear()
-        db_sess.commit()
-        logger.info(f"Users removed from travel with id: {travel_id}")
+    async def remove_users(travel_id: int) -> None:
+        async with db_session.async_session_scope() as db_sess:
+            travel = await Travel.get_travel(db_sess, travel_id, ("invited_users",))
+            travel.invited_users.clear()
+            await db_sess.commit()
+            logger.info(f"Users removed from travel with id: {travel_id}")
 
     @staticmethod
-    def remove_locations(travel_id: int) -> None:
-        db_sess = db_session.create_session()
-        travel = db_sess.query(Travel).filter(Travel.id == travel_id).first()
-        travel.locations.clear()
-        db_sess.commit()
-        logger.info(f"Locations removed from travel with id: {travel_id}")
+    async def remove_locations(travel_id: int) -> None:
+        async with db_session.async_session_scope() as db_sess:
+            travel = await Travel.get_travel(db_sess, travel_id, ("stops",))
+            travel.stops.clear()
+            await db_sess.commit()
+            logger.info(f"Locations removed from travel with id: {travel_id}")
 
     @staticmethod
-    def add_location(travel_id: int, city_id: int) -> None:
-        db_sess = db_session.create_session()
-        travel = db_sess.query(Travel).filter(Travel.id == travel_id).first()
-        city = db_sess.query(City).filter(City.id == city_id).first()
-        travel.locations.append(city)
-        db_sess.commit()
-        logger.info(f"City with id: {city_id} added to travel with id: {travel_id}")
+    async def add_location(travel_id: int, city_id: int) -> None:
+        async with db_session.async_session_scope() as db_sess:
+            db_sess.add(TravelLocation(travel_id=travel_id, city_id=city_id))
+            await db_sess.commit()
+            logger.info(f"City with id: {city_id} added to travel with id: {travel_id}")
 
     @staticmethod
-    def edit_value(
+    async def edit_value(
         travel_id: int, column_name: str, value: str | int | datetime.datetime
     ) -> None:
-        db_sess = db_session.create_session()
-        travel = db_sess.query(Travel).filter(Travel.id == travel_id).first()
-        match column_name:
-            case "name":
-                travel.name = value
-            case "description":
-                travel.description = value
-            case "start_date":
-                travel.start_date = value
-            case "end_date":
-                travel.end_date = value
-        db_sess.commit()
-        logger.info(f"Value {column_name} changed in travel with id: {travel_id}")
+        async with db_session.async_session_scope() as db_sess:
+            travel = await db_sess.get(Travel, travel_id)
+            match column_name:
+                case "name":
+                    travel.name = value
+                case "description":
+                    travel.description = value
+                case "start_date":
+                    travel.start_date = value
+                case "end_date":
+                    travel.end_date = value
+            await db_sess.commit()
+            logger.info(f"Value {column_name} changed in travel with id: {travel_id}")
 
 
 # noinspection PyTypeChecker
@@ -176,7 +229,10 @@ class TravelNote(db_session.SqlAlchemyBase):
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
     travel_id = sqlalchemy.Column(
-        sqlalchemy.Integer, sqlalchemy.ForeignKey("travels.id"), nullable=False
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey("travels.id"),
+        nullable=False,
+        index=True,
     )
     by_user_id = sqlalchemy.Column(
         sqlalchemy.Integer, sqlalchemy.ForeignKey("users.id"), nullable=False
@@ -185,40 +241,43 @@ class TravelNote(db_session.SqlAlchemyBase):
     is_public = sqlalchemy.Column(sqlalchemy.Boolean, nullable=False, default=False)
     note = sqlalchemy.Column(sqlalchemy.String, nullable=False)
 
-    travel = sqlalchemy.orm.relationship("Travel")
-    by_user = sqlalchemy.orm.relationship("User")
+    travel = sqlalchemy.orm.relationship(
+        "Travel", back_populates="notes", lazy="raise"
+    )
+    by_user = sqlalchemy.orm.relationship("User", lazy="raise")
 
     @staticmethod
-    def add_note(
+    async def add_note(
         travel_id: int, user_id: int, note: str, is_public: bool
     ) -> "TravelNote":
-        db_sess = db_session.create_session()
-        travel = db_sess.query(Travel).filter(Travel.id == travel_id).first()
-        travel_notes = TravelNote(
-            travel=travel, by_user_id=user_id, note=note, is_public=is_public
-        )
-        db_sess.add(travel_notes)
-        db_sess.commit()
-        logger.info(f"Note added to travel with id: {travel_id}")
-        return travel_notes
+        async with db_session.async_session_scope() as db_sess:
+            travel_notes = TravelNote(
+                travel_id=travel_id, by_user_id=user_id, note=note, is_public=is_public
+            )
+            db_sess.add(travel_notes)
+            await db_sess.commit()
+            logger.info(f"Note added to travel with id: {travel_id}")
+            return travel_notes
 
     @staticmethod
-    def get_travel_notes(travel_id: int) -> list["TravelNote"]:
-        db_sess = db_session.create_session()
-        travel_notes = (
-            db_sess.query(TravelNote).filter(TravelNote.travel_id == travel_id).all()
-        )
-        return travel_notes
+    async def get_travel_notes(travel_id: int) -> list["TravelNote"]:
+        async with db_session.async_session_scope() as db_sess:
+            travel_notes = (
+                await db_sess.scalars(
+                    sqlalchemy.select(TravelNote).where(
+                        TravelNote.travel_id == travel_id
+                    )
+                )
+            ).all()
+            return travel_notes
 
     @staticmethod
-    def delete_note(note_id: int) -> None:
-        db_sess = db_session.create_session()
-        travel_notes = (
-            db_sess.query(TravelNote).filter(TravelNote.id == note_id).first()
-        )
-        db_sess.delete(travel_notes)
-        db_sess.commit()
-        logger.info(f"Note with id: {note_id} deleted")
+    async def delete_note(note_id: int) -> None:
+        async with db_session.async_session_scope() as db_sess:
+            travel_notes = await db_sess.get(TravelNote, note_id)
+            await db_sess.delete(travel_notes)
+            await db_sess.commit()
+            logger.info(f"Note with id: {note_id} deleted")
 
 
 class TravelPurchase(db_session.SqlAlchemyBase):
@@ -226,71 +285,106 @@ class TravelPurchase(db_session.SqlAlchemyBase):
 
     id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
     travel_id = sqlalchemy.Column(
-        sqlalchemy.Integer, sqlalchemy.ForeignKey("travels.id"), nullable=False
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey("travels.id"),
+        nullable=False,
+        index=True,
     )
     user_id = sqlalchemy.Column(
-        sqlalchemy.Integer, sqlalchemy.ForeignKey("users.id"), nullable=False
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey("users.id"),
+        nullable=False,
+        index=True,
     )
     on_date = sqlalchemy.Column(sqlalchemy.DateTime, nullable=False, default=datetime.datetime.now)
 
     price = sqlalchemy.Column(sqlalchemy.Integer, nullable=False)
     note = sqlalchemy.Column(sqlalchemy.String, nullable=True)
 
-    travel = sqlalchemy.orm.relationship("Travel")
-    by_user = sqlalchemy.orm.relationship("User")
+    travel = sqlalchemy.orm.relationship(
+        "Travel", back_populates="purchases", lazy="raise"
+    )
+    by_user = sqlalchemy.orm.relationship("User", lazy="raise")
 
     @staticmethod
-    def add_purchase(travel_id: int, user_id: int, price: int, note: str):
-        db_sess = db_session.create_session()
-        purchase = TravelPurchase(
-            travel_id=travel_id, user_id=user_id, price=price, note=note
-        )
-        db_sess.add(purchase)
-        db_sess.commit()
-        logger.info(f"Purchase added to travel with id: {travel_id}")
+    async def add_purchase(travel_id: int, user_id: int, price: int, note: str):
+        async with db_session.async_session_scope() as db_sess:
+            purchase = TravelPurchase(
+                travel_id=travel_id, user_id=user_id, price=price, note=note
+            )
+            db_sess.add(purchase)
+            await db_sess.commit()
+            logger.info(f"Purchase added to travel with id: {travel_id}")
 
     @staticmethod
-    def get_travel_purchases(travel_id: int) -> list["TravelPurchase"]:
-        db_sess = db_session.create_session()
-        travel_purchases = (
-            db_sess.query(TravelPurchase).filter(TravelPurchase.travel_id == travel_id).all()
-        )
-        return travel_purchases
+    async def get_travel_purchases(travel_id: int) -> list["TravelPurchase"]:
+        async with db_session.async_session_scope() as db_sess:
+            travel_purchases = (
+                await db_sess.scalars(
+                    sqlalchemy.select(TravelPurchase).where(
+                        TravelPurchase.travel_id == travel_id
+                    )
+                )
+            ).all()
+            return travel_purchases
 
     @staticmethod
-    def get_user_purchases(user_id: int) -> list["TravelPurchase"]:
-        db_sess = db_session.create_session()
-        travel_purchases = (
-            db_sess.query(TravelPurchase).filter(TravelPurchase.user_id == user_id).all()
-        )
-        return travel_purchases
+    async def get_user_purchases(user_id: int) -> list["TravelPurchase"]:
+        async with db_session.async_session_scope() as db_sess:
+            travel_purchases = (
+                await db_sess.scalars(
+                    sqlalchemy.select(TravelPurchase).where(
+                        TravelPurchase.user_id == user_id
+                    )
+                )
+            ).all()
+            return travel_purchases
 
     @staticmethod
-    def get_user_total_price(user_id: int) -> int:
-        db_sess = db_session.create_session()
-        total_price = 0
-        travel_purchases = db_sess.query(TravelPurchase).filter(TravelPurchase.user_id == user_id).all()
-        for purchase in travel_purchases:
-            total_price += purchase.price
-        return total_price
+    async def get_user_total_price(user_id: int) -> int:
+        async with db_session.async_session_scope() as db_sess:
+            total_price = 0
+            travel_purchases = (
+                await db_sess.scalars(
+                    sqlalchemy.select(TravelPurchase).where(
+                        TravelPurchase.user_id == user_id
+                    )
+                )
+            ).all()
+            for purchase in travel_purchases:
+                total_price += purchase.price
+            return total_price
+
+
+class TravelLocation(db_session.SqlAlchemyBase):
+    __tablename__ = "travel_to_city"
+
+    # Travel may visit the same city more than once, so rows get their own key
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True)
+    travel_id = sqlalchemy.Column(
+        sqlalchemy.Integer, sqlalchemy.ForeignKey("travels.id"), index=True
+    )
+    city_id = sqlalchemy.Column(
+        sqlalchemy.Integer, sqlalchemy.ForeignKey("cities.id"), index=True
+    )
+
+    city = sqlalchemy.orm.relationship("City", lazy="raise")
 
 
 travel_to_user = sqlalchemy.Table(
     "travel_to_user",
     db_session.SqlAlchemyBase.metadata,
     sqlalchemy.Column(
-        "travel_id", sqlalchemy.Integer, sqlalchemy.ForeignKey("travels.id")
-    ),
-    sqlalchemy.Column("user_id", sqlalchemy.Integer, sqlalchemy.ForeignKey("users.id")),
-)
-
-travel_to_city = sqlalchemy.Table(
-    "travel_to_city",
-    db_session.SqlAlchemyBase.metadata,
-    sqlalchemy.Column(
-        "travel_id", sqlalchemy.Integer, sqlalchemy.ForeignKey("travels.id")
+        "travel_id",
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey("travels.id"),
+        primary_key=True,
     ),
     sqlalchemy.Column(
-        "city_id", sqlalchemy.Integer, sqlalchemy.ForeignKey("cities.id")
+        "user_id",
+        sqlalchemy.Integer,
+        sqlalchemy.ForeignKey("users.id"),
+        primary_key=True,
+        index=True,
     ),
 )
@@ -33,37 +33,51 @@ class User(db_session.SqlAlchemyBase):
 
     registered = sqlalchemy.Column(sqlalchemy.DateTime, default=datetime.datetime.now)
 
-    city = sqlalchemy.orm.relationship("City", lazy="subquery")
-    country = sqlalchemy.orm.relationship("Country", lazy="subquery")
+    city = sqlalchemy.orm.relationship("City", lazy="raise")
+    country = sqlalchemy.orm.relationship("Country", lazy="raise")
 
     travels = sqlalchemy.orm.relationship(
-        "Travel", back_populates="owner", lazy="subquery"
+        "Travel", back_populates="owner", lazy="raise"
     )
     invited_travels = sqlalchemy.orm.relationship(
         "Travel",
         secondary="travel_to_user",
         back_populates="invited_users",
-        lazy="subquery",
+        lazy="raise",
     )
 
     @staticmethod
-    def get_user(user_id: int) -> Union["User", None]:
-        db_sess = db_session.create_session()
-        # noinspection PyTypeChecker
-        return db_sess.query(User).filter(User.id == user_id).first()
+    async def get_user(
+        user_id: int, load: tuple[str, ...] = ()
+    ) -> Union["User", None]:
+        async with db_session.async_session_scope() as db_sess:
+            # noinspection PyTypeChecker
+            return await db_sess.scalar(
+                sqlalchemy.select(User)
+                .options(*db_session.get_load_options(User, load))
+                .where(User.id == user_id)
+            )
 
     @staticmethod
-    def get_user_by_tg_username(tg_username: str) -> Union["User", None]:
-        db_sess = db_session.create_session()
-        return db_sess.query(User).filter(User.tg_username == tg_username).first()
+    async def get_user_by_tg_username(tg_username: str) -> Union["User", None]:
+        async with db_session.async_session_scope() as db_sess:
+            return await db_sess.scalar(
+                sqlalchemy.select(User).where(User.tg_username == tg_username)
+            )
 
     @staticmethod
-    def get_user_by_tg_id(tg_id: int) -> Union["User", None]:
-        db_sess = db_session.create_session()
-        return db_sess.query(User).filter(User.id == tg_id).first()
+    async def get_user_by_tg_id(
+        tg_id: int, load: tuple[str, ...] = ()
+    ) -> Union["User", None]:
+        async with db_session.async_session_scope() as db_sess:
+            return await db_sess.scalar(
+                sqlalchemy.select(User)
+                .options(*db_session.get_load_options(User, load))
+                .where(User.id == tg_id)
+            )
 
     @staticmethod
-    def create_user(
+    async def create_user(
         user_id: int,
         tg_username: str,
         city_id: int,
@@ -73,18 +87,18 @@ class User(db_session.SqlAlchemyBase):
         age: int,
         bio: str | None,
     ) -> "User":
-        db_sess = db_session.create_session()
-        user = User(
-            id=user_id,
-            tg_username=tg_username,
-            city_id=city_id,
-            city_name=city_name,
-            country_id=country_id,
-            country_name=country_name,
-            age=age,
-            bio=bio,
-        )
-        db_sess.add(user)
-        db_sess.commit()
-        logger.info(f"User with id: {user_id} created")
-        return user
+        async with db_session.async_session_scope() as db_sess:
+            user = User(
+                id=user_id,
+                tg_username=tg_username,
+                city_id=city_id,
+                city_name=city_name,
+                country_id=country_id,
+                country_name=country_name,
+                age=age,
+                bio=bio,
+            )
+            db_sess.add(user)
+            await db_sess.commit()
+            logger.info(f"User with id: {user_id} created")
+            return user